@@ -47,6 +47,7 @@ class ControlManager(Thread):
             raise
 
         self.running = True
+        self.ready = threading.Event()  # Установлен после первого прохода цикла
         self.press_controller = None
         self.safety = SafetyMonitor(press_id)
         # 🔥 СОХРАНЯЕМ в state для общего доступа
@@ -106,7 +107,9 @@ class ControlManager(Thread):
             self.logger.addHandler(handler)
 
     def _on_start_confirmed(self):
-        if self.press_controller and self.press_controller.running:
+        # is_alive, а не running: running выставляется только после загрузки программы,
+        # и повторный старт в этот момент породил бы второй поток на тот же пресс
+        if self.press_controller and self.press_controller.is_alive():
             self.logger.info(f"CM Пресс-{self.press_id + 1}: start_btn подтверждён, но программа уже запущена")
             return
 
@@ -208,6 +211,7 @@ class ControlManager(Thread):
                     self.pressure_controller.stop_all()
 
                 state.get(f"press_{self.press_id}_step_running_pressure", False)
+                self.ready.set()
                 time.sleep(0.1)
             except Exception as e:
                 self.logger.error(f"Ошибка в цикле: {e}", exc_info=True)
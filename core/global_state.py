@@ -132,6 +132,12 @@ class GlobalState:
         with self._lock:
             return self._data.get(key, default)
 
+    def get_many(self, keys) -> Dict[str, Any]:
+        """Несколько значений за один захват блокировки; отсутствующих ключей в ответе нет"""
+        with self._lock:
+            data = self._data
+            return {k: data[k] for k in keys if k in data}
+
     def __contains__(self, key: str) -> bool:
         with self._lock:
             return key in self._data
@@ -4,10 +4,11 @@
 Если очередь пуста — читаем DI (кнопки, E-Stop).
 """
 import json
+import os
 import time
 import logging
 import traceback
-from threading import Thread
+from threading import Thread, Event
 from core.global_state import state
 
 
@@ -22,14 +23,24 @@ class HardwareDaemon(Thread):
         self.last_ai_time = 0
         self.last_do_time = 0
         self.last_pressure_time = 0
+        self._p_config_stamp = None
         self.p_config = self._load_config_pid()
         self.offsets = []
+        self.ready = Event()  # Установлен после первого прохода цикла
         state.set_hardware_interface(hardware_interface, daemon_mode=True)
         logging.info("HD HardwareDaemon инициализирован")
 
     def _load_config_pid(self):
-        with open("config/pid_config.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+        """Перечитывает pid_config.json, только если файл изменился (mtime/размер)."""
+        path = "config/pid_config.json"
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._p_config_stamp:
+            return self.p_config
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self._p_config_stamp = stamp
+        return config
 
     def run(self):
         logging.info("HD HardwareDaemon запущен")
@@ -63,6 +74,7 @@ class HardwareDaemon(Thread):
                     self.hw.log_quality_report()
                     last_report = now
 
+                self.ready.set()
                 time.sleep(0.01)
 
             except Exception as e:
@@ -85,10 +85,12 @@ class HardwareInterface:
     - Остальные модули должны использовать global_state.
     """
 
-    def __init__(self, config_path: str = "config/system.json", direct_mode: bool = False):
+    def __init__(self, config_path: str = "config/system.json", direct_mode: bool = False,
+                 config: Optional[Dict[str, Any]] = None):
         self.config_path = config_path
         self.direct_mode = direct_mode  # ✅ Новый флаг
-        self.config = self._load_config()
+        # Уже разобранный system.json можно передать готовым, чтобы не читать файл повторно
+        self.config = config if config is not None else self._load_config()
         self.mode = self.config.get("mode", "simulation")  # real / simulation
         self.baudrate = self.config.get("baudrate", 9600)
         self.timeout = self.config.get("timeout", 1.0)
@@ -272,6 +274,14 @@ class HardwareInterface:
             hardware_logger.error(f"Ошибка отправки '{command}': {e}")
             return None
 
+    def send_commands(self, commands: List[str]) -> List[Optional[str]]:
+        """
+        Пакетная отправка: команды идут подряд под одной блокировкой шины.
+        Возвращает ответы в том же порядке (None — нет ответа).
+        """
+        with self.lock:
+            return [self._send_command(cmd) for cmd in commands]
+
     def read_ai(self, module_id: str) -> List[str]:
         """
         Читает все 8 значений с AI-модуля.
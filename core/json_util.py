@@ -0,0 +1,26 @@
+# core/json_util.py
+"""
+Разбор JSON: orjson, если установлен, иначе стандартный json.
+"""
+import json
+
+# orjson быстрее разбирает JSON; без него работаем на стандартном json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    """Разбирает JSON из bytes, memoryview или str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+def load_file(path):
+    """Читает и разбирает JSON-файл."""
+    with open(path, "rb") as f:
+        return loads(f.read())
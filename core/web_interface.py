@@ -14,6 +14,7 @@ import json
 from datetime import datetime
 from flask import Flask, render_template, Response, request, redirect, url_for, jsonify
 from core.global_state import state
+from core.json_util import load_file as _load_json_file
 
 import sys
 
@@ -114,9 +115,8 @@ class WebInterface(threading.Thread):
             programs = {}
             for pid in [1, 2, 3]:
                 try:
-                    with open(f"programs/press{pid}.json", "r", encoding="utf-8") as f:
-                        programs[f"press{pid}"] = json.load(f)
-                        # state.set(f"press_{pid}_p_name", programs.get("name", ""))
+                    programs[f"press{pid}"] = _load_json_file(f"programs/press{pid}.json")
+                    # state.set(f"press_{pid}_p_name", programs.get("name", ""))
                 except FileNotFoundError:
                     programs[f"press{pid}"] = {"temp_program": [], "pressure_program": []}
             return jsonify(programs)
@@ -359,8 +359,7 @@ class WebInterface(threading.Thread):
         @self.app.route("/get_pid_config")
         def get_pid_config():
             try:
-                with open("config/pid_config.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                data = _load_json_file("config/pid_config.json")
                 return jsonify(data)
             except Exception as e:
                 logging.error(f"Ошибка загрузки pid_config.json: {e}")
@@ -1,5 +1,6 @@
 # diagnose.py
 
+import sys
 import json
 import time
 import logging
@@ -11,14 +12,36 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s [DIAG] %(levelname)s: %(message)s',
     handlers=[
-        logging.FileHandler("diagnostics.log", encoding="utf-8"),
+        logging.FileHandler("diagnostics.log", encoding="utf-8", delay=True),
         #logging.StreamHandler()
     ]
 )
+logger = logging.getLogger("diag")
+
+# Двоичное представление байта: 16-битное слово = _B8[старший] + _B8[младший]
+_B8 = [f"{i:08b}" for i in range(256)]
+
+# Меню — одной строкой, выводится одной записью
+_MENU = (
+    "\n🔧 СИСТЕМА ДИАГНОСТИКИ DCON\n"
+    "1 — Проверить связь со всеми модулями\n"
+    "2 — Прочитать все AI (температуры)\n"
+    "3 — Прочитать все DI/DO\n"
+    "4 — Полная диагностика всех прессов\n"
+    "5 — Проверить общие модули (DI)\n"
+    "6 — Управление DO: напрямую (LOW/HIGH)\n"
+    "7 — Управление DO: отдельный канал (on/off)\n"
+    "8 — Краткий отчёт по системе\n"
+    "9 — Сканирование сети DCON (автоопределение модулей)\n"
+    "10 — Вывод всех текущих значений DCON \n"
+    "0 — Выход\n"
+)
 
 # Глобальные переменные
 hw = None
 hw_config = None
+press_mods = []     # [(id пресса, AI, DO), ...] — заполняется в main()
+common_mods = ()    # (AI давления, DI1, DI2, DO1, DO2)
 
 
 def load_hardware_config():
@@ -26,19 +49,38 @@ def load_hardware_config():
         with open("config/hardware_config.json", "r", encoding="utf-8") as f:
             return json.load(f)
     except Exception as e:
-        logging.critical(f"Не удалось загрузить hardware_config.json: {e}")
+        logger.critical("Не удалось загрузить hardware_config.json: %s", e)
         return None
 
 
+def _bin16(value):
+    """16-битное значение DI/DO в виде строки бит, "????" если модуль не ответил"""
+    if value is None:
+        return "????"
+    return _B8[(value >> 8) & 0xFF] + _B8[value & 0xFF]
+
+
+def _format_ai(values, unit):
+    """Строки AI → ['20.8°C', ...]; формат .1f сам округляет до десятых"""
+    return [f"{num:.1f}{unit}" for num in map(float, values or ())]
+
+
+def _stamp_ids(devices):
+    """Один раз форматирует адрес модуля ("5" → "05") и кладёт его в _id_str"""
+    for dev in devices:
+        dev["_id_str"] = f"{int(dev['id']):02d}"
+    return devices
+
+
 def test_connection(module_id: str, module_type: str = ""):
     command = f"${module_id}M"
     response = hw._send_command(command)
     if response and response.startswith(f"!{module_id}"):
-        logging.info(f" {module_type}-{module_id}: связь OK")
+        logger.info(" %s-%s: связь OK", module_type, module_id)
         print(f"✅ {module_type}-{module_id}: связь OK")
         return True
     else:
-        logging.error(f" {module_type}-{module_id}: нет ответа")
+        logger.error(" %s-%s: нет ответа", module_type, module_id)
         print(f"❌ {module_type}-{module_id}: нет ответа")
         return False
 
@@ -47,28 +89,28 @@ def read_ai(module_id: str):
     """Чтение и парсинг AI с поддержкой формата +4.231, +20.500, +0020.9"""
     command = f"#{module_id}"
     response = hw._send_command(command)
-    logging.info(f"DCON: {command} -> {response}")
+    logger.info("DCON: %s -> %s", command, response)
     #print(f"DCON: {command} -> {response}")
     if not response:
-        logging.error(f" AI-{module_id}: нет ответа")
+        logger.error(" AI-%s: нет ответа", module_id)
         return None
 
     # Удаляем '>' и пробелы
     clean = response.strip().lstrip('>').strip()
 
     if not clean.startswith('+'):
-        logging.error(f" AI-{module_id}: ответ не начинается с '+': {clean}")
+        logger.error(" AI-%s: ответ не начинается с '+': %s", module_id, clean)
         return None
 
     # Разбиваем по '+' и убираем пустые
     raw_values = [val.strip() for val in clean.split('+') if val.strip()]
 
     if not raw_values:
-        logging.error(f" AI-{module_id}: не удалось извлечь значения")
+        logger.error(" AI-%s: не удалось извлечь значения", module_id)
         return None
 
     # Логируем как сырые строки
-    logging.info(f" AI-{module_id}: сырые данные: {raw_values}")
+    logger.info(" AI-%s: сырые данные: %s", module_id, raw_values)
     return raw_values  # возвращаем список строк
 
 
@@ -76,21 +118,21 @@ def read_di_do(module_id: str):
     """Чтение DI/DO: возвращает HEX и BIN, логирует как есть"""
     command = f"@{module_id}"
     response = hw._send_command(command)
-    logging.info(f"DCON: {command} -> {response}")
+    logger.info("DCON: %s -> %s", command, response)
     #print(f"DCON: {command} -> {response}")
 
     if not response or not response.startswith('>'):
-        logging.error(f" DI/DO-{module_id}: нет ответа или ошибка формата")
+        logger.error(" DI/DO-%s: нет ответа или ошибка формата", module_id)
         return None
 
     hex_str = response[1:].strip()
     try:
         value = int(hex_str, 16)
-        binary = f"{value:016b}"
-        logging.info(f" DI/DO-{module_id}: HEX={hex_str}, BIN={binary}")
+        binary = _bin16(value)
+        logger.info(" DI/DO-%s: HEX=%s, BIN=%s", module_id, hex_str, binary)
         return {"hex": hex_str, "bin": binary, "int": value}
     except ValueError:
-        logging.error(f" DI/DO-{module_id}: не удалось разобрать HEX: {hex_str}")
+        logger.error(" DI/DO-%s: не удалось разобрать HEX: %s", module_id, hex_str)
         return None
 
 
@@ -98,20 +140,20 @@ def write_do(module_id: Union[str, int], byte_low: int, byte_high: int):
     """Обёртка для hw.write_do — вызывает через глобальный hw"""
     global hw
     if hw is None:
-        logging.error(" HardwareInterface не инициализирован")
+        logger.error(" HardwareInterface не инициализирован")
         return
 
     try:
         # Вызываем метод из hardware_interface
         hw.write_do(module_id, byte_low, byte_high)
     except Exception as e:
-        logging.error(f" Ошибка вызова hw.write_do: {e}")
+        logger.error(" Ошибка вызова hw.write_do: %s", e)
 
 
-def toggle_do_channel(module_id: str, channel: int, on: bool):
+def toggle_do_channel(module_id: str, channel: int, on: bool, verify: bool = False):
     if channel < 0 or channel > 15:
-        logging.error("Канал должен быть 0–15")
-        return
+        logger.error("Канал должен быть 0–15")
+        return False
 
     current = hw.read_digital(module_id) or 0
     mask = 1 << channel
@@ -123,23 +165,30 @@ def toggle_do_channel(module_id: str, channel: int, on: bool):
         action = "выключен"
 
     hw.write_do(module_id, new_state & 0xFF, (new_state >> 8) & 0xFF)
-    time.sleep(0.1)
+    if not verify:
+        return True
 
-    # Проверка
-    readback = hw.read_digital(module_id)
-    if readback is not None and bool(readback & mask) == on:
-        logging.info(f" DO-{module_id}.{channel} {action}")
-    else:
-        logging.error(f" DO-{module_id}.{channel}: ошибка {action}")
+    # Проверка: опрашиваем, пока модуль не отразит запись, но не дольше ~100 мс
+    # (плюс одно чтение); модуль не отвечает — сразу ошибка, без повторных таймаутов
+    deadline = time.monotonic() + 0.1
+    while True:
+        time.sleep(0.005)
+        readback = hw.read_digital(module_id)
+        if readback is None:
+            break
+        if bool(readback & mask) == on:
+            logger.info(" DO-%s.%s %s", module_id, channel, action)
+            return True
+        if time.monotonic() >= deadline:
+            break
+    logger.error(" DO-%s.%s: ошибка %s", module_id, channel, action)
+    return False
 
 
 def test_all_presses():
-    logging.info(" Проверка всех прессов...")
-    for press in hw_config["presses"]:
-        pid = press["id"]
+    logger.info(" Проверка всех прессов...")
+    for pid, ai, do in press_mods:
         print("+++++++Проверка прессa "+ str(pid)+" ++++++++++++++")
-        ai = press["modules"]["ai"]
-        do = press["modules"]["do"]
         test_connection(ai, "AI")
         read_ai(ai)
         test_connection(do, "DO")
@@ -150,11 +199,7 @@ def test_all_presses():
 
 def test_common_modules():
     print("+++++++test_common_modules++++++++++")
-    ai = hw_config["common"]["ai_pressure_module"]
-    di = hw_config["common"]["di_module"]
-    di2 = hw_config["common"]["di_module_2"]
-    do1 = hw_config["common"]["do_module_1"]
-    do2 = hw_config["common"]["do_module_2"]
+    ai, di, di2, do1, do2 = common_mods
     test_connection(ai, "AI - Pressure ")
     read_ai(ai)
     test_connection(di, "DI1 - Buttons ")
@@ -172,7 +217,7 @@ def manual_do_control():
     print("\n🔧 Ручное управление DO (введите 00 для выхода)")
     global hw
     if hw is None:
-        logging.error("❌ hw не инициализирован")
+        logger.error("❌ hw не инициализирован")
         return
 
     while True:
@@ -181,7 +226,7 @@ def manual_do_control():
             if mod_input == "00":
                 break
             if not mod_input.isdigit():
-                logging.error("ID модуля должен быть числом")
+                logger.error("ID модуля должен быть числом")
                 continue
 
             low_hex = input("LOW (HEX, 00–FF): ").strip()
@@ -191,13 +236,13 @@ def manual_do_control():
             byte_high = int(high_hex, 16)
             module_id = int(mod_input)
 
-            logging.info(f" Запись DO: модуль={module_id}, LOW=0x{byte_low:02X}, HIGH=0x{byte_high:02X}")
+            logger.info(" Запись DO: модуль=%s, LOW=0x%02X, HIGH=0x%02X", module_id, byte_low, byte_high)
             write_do(module_id, byte_low, byte_high)  # вызывает обёртку
 
         except ValueError:
-            logging.error("Некорректное HEX-значение. Используйте 00–FF.")
+            logger.error("Некорректное HEX-значение. Используйте 00–FF.")
         except Exception as e:
-            logging.error(f"Ошибка: {e}")
+            logger.error("Ошибка: %s", e)
 
 def interactive_do_channel():
     print("\n🔧 Управление отдельным каналом DO")
@@ -206,25 +251,25 @@ def interactive_do_channel():
         ch = int(input("Канал (0–15): "))
         action = input("Действие (on/off): ").strip().lower()
         if action == "on":
-            toggle_do_channel(mod, ch, True)
+            toggle_do_channel(mod, ch, True, verify=True)
         elif action == "off":
-            toggle_do_channel(mod, ch, False)
+            toggle_do_channel(mod, ch, False, verify=True)
         else:
-            logging.error("Введите on или off")
+            logger.error("Введите on или off")
     except Exception as e:
-        logging.error(f"Ошибка: {e}")
+        logger.error("Ошибка: %s", e)
 
 
 def read_all_ai():
         """Чтение всех AI-модулей из dcon_devices"""
-        logging.info(" Чтение всех AI-модулей...")
+        logger.info(" Чтение всех AI-модулей...")
 
         try:
             with open("config/config.json", "r", encoding="utf-8") as f:
                 config = json.load(f)
-            devices = config.get("dcon_devices", [])
+            devices = _stamp_ids(config.get("dcon_devices", []))
         except Exception as e:
-            logging.error(f"Не удалось загрузить config.json: {e}")
+            logger.error("Не удалось загрузить config.json: %s", e)
             return
 
         # Фильтруем только AI-модули
@@ -232,27 +277,27 @@ def read_all_ai():
         # print(ai_modules)
 
         if not ai_modules:
-            logging.warning(" В dcon_devices нет AI-модулей (7017/7018)")
+            logger.warning(" В dcon_devices нет AI-модулей (7017/7018)")
             return
 
         for dev in ai_modules:
             try:
-                module_id = f"{int(dev['id']):02d}"
+                module_id = dev["_id_str"]
                 read_ai(module_id)
             except Exception as e:
-                logging.error(f" Ошибка при чтении AI-{module_id}: {e}")
+                logger.error(" Ошибка при чтении AI-%s: %s", module_id, e)
 
 
 def read_all_di_do():
-    logging.info(" Чтение всех DI/DO...")
+    logger.info(" Чтение всех DI/DO...")
     print("📌 Чтение всех DI/DO...")
 
     try:
         with open("config/config.json", "r", encoding="utf-8") as f:
             config = json.load(f)
-        devices = config.get("dcon_devices", [])
+        devices = _stamp_ids(config.get("dcon_devices", []))
     except Exception as e:
-        logging.error(f"Не удалось загрузить config.json: {e}")
+        logger.error("Не удалось загрузить config.json: %s", e)
         return
 
     # Фильтруем только AI-модули
@@ -260,64 +305,40 @@ def read_all_di_do():
     # print(ai_modules)
 
     if not di_modules:
-        logging.warning(" В dcon_devices нет DI-модулей (7051/7045)")
+        logger.warning(" В dcon_devices нет DI-модулей (7051/7045)")
         return
 
     for dev in di_modules:
         try:
-            module_id = f"{int(dev['id']):02d}"
+            module_id = dev["_id_str"]
             read_di_do(module_id)
         except Exception as e:
-            logging.error(f" Ошибка при чтении DI-{module_id}: {e}")
+            logger.error(" Ошибка при чтении DI-%s: %s", module_id, e)
 
 def check_all_connections():
-    logging.info("Проверка связи со всеми модулями...")
+    logger.info("Проверка связи со всеми модулями...")
     print("🔌 Проверка связи со всеми модулями...")
-    for press in hw_config["presses"]:
-        ai = press["modules"]["ai"]
-        do = press["modules"]["do"]
+    for _, ai, do in press_mods:
         test_connection(ai, "AI")
         test_connection(do, "DO")
     test_common_modules()
 
 
 def show_status_summary():
+    ai, di, di2, do1, do2 = common_mods
+
     print("\n" + "="*50)
     print("КРАТКИЙ ОТЧЁТ ПО ОБОРУДОВАНИЮ")
     print("="*50)
-    for i, press in enumerate(hw_config["presses"], 1):
-        ai_mod = press["modules"]["ai"]
-        do_mod = press["modules"]["do"]
-        ai_temp = read_ai(ai_mod)
-        temp_str = []
-        for value in ai_temp:
-            num = round(float(value), 1)
-            formatted = f"{num:.1f}" + '°C'
-            temp_str.append(formatted)
-
-        do_val = hw.read_digital(do_mod)
-        do_bin = f"{do_val:016b}" if do_val else "????"
-        print(f"Пресс {i}: T={temp_str} | DO={do_bin}")
-
-    ai = hw_config["common"]["ai_pressure_module"]
-    di = hw_config["common"]["di_module"]
-    di2 = hw_config["common"]["di_module_2"]
-    do1 = hw_config["common"]["do_module_1"]
-    do2 = hw_config["common"]["do_module_2"]
-
-    ai_temp = read_ai(ai)
-    temp_str = []
-    for value in ai_temp:
-        num = round(float(value), 1)
-        formatted = f"{num:.1f}" + ' bar'
-        temp_str.append(formatted)
-
-    di_val = hw.read_digital(di)
-    di_val2 = hw.read_digital(di2)
-    di_bin = f"{di} = {di_val:016b} | {di2} = {di_val2:016b}" if di_val else "????"
-    do_val = hw.read_digital(do1)
-    do_val2 = hw.read_digital(do2)
-    do_bin = f"{do1} = {do_val:016b} | {do2} = {do_val2:016b}" if do_val else "????"
+    for i, (_, p_ai, p_do) in enumerate(press_mods, 1):
+        temp_str = _format_ai(read_ai(p_ai), "°C")
+        do_val = hw.read_digital(p_do)
+        print(f"Пресс {i}: T={temp_str} | DO={_bin16(do_val)}")
+
+    temp_str = _format_ai(read_ai(ai), " bar")
+
+    di_bin = f"{di} = {_bin16(hw.read_digital(di))} | {di2} = {_bin16(hw.read_digital(di2))}"
+    do_bin = f"{do1} = {_bin16(hw.read_digital(do1))} | {do2} = {_bin16(hw.read_digital(do2))}"
     print(f"Общие DI: {di_bin}")
     print(f"Общие DO: {do_bin}")
     print(f"Давление : {temp_str}")
@@ -330,12 +351,12 @@ def show_network():
     try:
         with open(config_path, "r", encoding="utf-8") as f:
             config = json.load(f)
-        devices = config.get("dcon_devices", [])
+        devices = _stamp_ids(config.get("dcon_devices", []))
         if not devices:
-            logging.warning(f"В {config_path} нет dcon_devices.")
+            logger.warning("В %s нет dcon_devices.", config_path)
             return
     except Exception as e:
-        logging.error(f"Не удалось загрузить {config_path}: {e}")
+        logger.error("Не удалось загрузить %s: %s", config_path, e)
         return
 
     print("\n" + "="*60)
@@ -347,7 +368,7 @@ def show_network():
     if ai_modules:
         print("📡 АНАЛОГОВЫЕ ВХОДЫ (AI):")
         for dev in ai_modules:
-            module_id = f"{int(dev['id']):02d}"
+            module_id = dev["_id_str"]
             data = read_ai(module_id)
             if data:
                 print(f"  AI-{module_id}: {' + '.join(data)}")
@@ -357,7 +378,7 @@ def show_network():
     if dio_modules:
         print("\n🔢 ДИСКРЕТНЫЕ ВХОДЫ/ВЫХОДЫ (DI/DO):")
         for dev in dio_modules:
-            module_id = f"{int(dev['id']):02d}"
+            module_id = dev["_id_str"]
             data = read_di_do(module_id)
             if data:
                 print(f"  DO/DI-{module_id}: HEX={data['hex']}, BIN={data['bin']}")
@@ -367,7 +388,7 @@ def show_network():
 
 def scan_network():
     """Сканирование сети DCON: поиск всех отвечающих модулей"""
-    logging.info(" Сканирование сети DCON (адреса 01–40)...")
+    logger.info(" Сканирование сети DCON (адреса 01–40)...")
     print("🔍 Сканирование сети DCON (адреса 01–40)...")
     discovered = []
 
@@ -398,11 +419,11 @@ def scan_network():
                 "type": model_code
             }
             discovered.append(info)
-            logging.info(f" Найден {model} по адресу {module_id}, ответ {response}")
+            logger.info(" Найден %s по адресу %s, ответ %s", model, module_id, response)
             print(f"✅ Найден {model} по адресу {module_id}")
 
     if not discovered:
-        logging.warning(" Ни одного модуля DCON не найдено.")
+        logger.warning(" Ни одного модуля DCON не найдено.")
         return
 
     print("\n" + "="*60)
@@ -423,12 +444,12 @@ def scan_network():
         # Читаем СУЩЕСТВУЮЩИЙ config.json
         with open(config_path, "r", encoding="utf-8") as f:
             config_data = json.load(f)
-        logging.info(f"Загружен существующий конфиг: {config_path}")
+        logger.info("Загружен существующий конфиг: %s", config_path)
     except FileNotFoundError:
-        logging.warning(f"{config_path} не найден. Создаём новый.")
+        logger.warning("%s не найден. Создаём новый.", config_path)
         config_data = {}
     except Exception as e:
-        logging.error(f"Ошибка чтения {config_path}: {e}. Создаём новый.")
+        logger.error("Ошибка чтения %s: %s. Создаём новый.", config_path, e)
         config_data = {}
 
     # Обновляем ТОЛЬКО ветку dcon_devices
@@ -438,80 +459,72 @@ def scan_network():
     try:
         with open(config_path, "w", encoding="utf-8") as f:
             json.dump(config_data, f, indent=2, ensure_ascii=False)
-        logging.info(f"✅ {config_path} успешно обновлён: dcon_devices записан.")
+        logger.info("✅ %s успешно обновлён: dcon_devices записан.", config_path)
         print(f"Файл {config_path} обновлён.")
     except Exception as e:
-        logging.error(f"❌ Не удалось сохранить {config_path}: {e}")
+        logger.error("❌ Не удалось сохранить %s: %s", config_path, e)
 
 
 def main_menu():
-    print("\n🔧 СИСТЕМА ДИАГНОСТИКИ DCON")
-    print("1 — Проверить связь со всеми модулями")
-    print("2 — Прочитать все AI (температуры)")
-    print("3 — Прочитать все DI/DO")
-    print("4 — Полная диагностика всех прессов")
-    print("5 — Проверить общие модули (DI)")
-    print("6 — Управление DO: напрямую (LOW/HIGH)")
-    print("7 — Управление DO: отдельный канал (on/off)")
-    print("8 — Краткий отчёт по системе")
-    print("9 — Сканирование сети DCON (автоопределение модулей)")
-    print("10 — Вывод всех текущих значений DCON ")
-    print("0 — Выход")
+    sys.stdout.write(_MENU)
 
     while True:
         choice = input("\nВыберите действие: ").strip()
 
-        if choice == "1":
-            check_all_connections()
-        elif choice == "2":
-            read_all_ai()
-        elif choice == "3":
-            read_all_di_do()
-        elif choice == "4":
-            test_all_presses()
-        elif choice == "5":
-            test_common_modules()
-        elif choice == "6":
-            manual_do_control()
-        elif choice == "7":
-            interactive_do_channel()
-        elif choice == "8":
-            show_status_summary()
-        elif choice == "9":
-            scan_network()
-        elif choice == "10":
-            show_network()
-        elif choice == "0":
-            logging.info("Диагностика завершена.")
+        if choice == "0":
+            logger.info("Диагностика завершена.")
             break
+        handler = _MENU_COMMANDS.get(choice)
+        if handler is not None:
+            handler()
         else:
             print("❌ Неверный выбор. Введите 1–9.")
 
 
+# Пункт меню → действие
+_MENU_COMMANDS = {
+    "1": check_all_connections,
+    "2": read_all_ai,
+    "3": read_all_di_do,
+    "4": test_all_presses,
+    "5": test_common_modules,
+    "6": manual_do_control,
+    "7": interactive_do_channel,
+    "8": show_status_summary,
+    "9": scan_network,
+    "10": show_network,
+}
+
+
 def main():
-    global hw, hw_config
+    global hw, hw_config, press_mods, common_mods
 
-    logging.info("Запуск диагностики DCON...")
+    logger.info("Запуск диагностики DCON...")
     hw_config = load_hardware_config()
 
     if not hw_config:
         exit(1)
 
+    press_mods = [(p["id"], p["modules"]["ai"], p["modules"]["do"]) for p in hw_config["presses"]]
+    common = hw_config["common"]
+    common_mods = (common["ai_pressure_module"], common["di_module"], common["di_module_2"],
+                   common["do_module_1"], common["do_module_2"])
+
     try:
         hw = HardwareInterface("config/system.json", direct_mode=True)
     except Exception as e:
-        logging.critical(f"Ошибка инициализации интерфейса: {e}")
+        logger.critical("Ошибка инициализации интерфейса: %s", e)
         exit(1)
 
     try:
         main_menu()
     except KeyboardInterrupt:
-        logging.info("Диагностика прервана пользователем.")
+        logger.info("Диагностика прервана пользователем.")
     except Exception as e:
-        logging.critical(f"Ошибка: {e}")
+        logger.critical("Ошибка: %s", e)
     finally:
         hw.close()
-        logging.info("Соединение закрыто.")
+        logger.info("Соединение закрыто.")
 
 
 if __name__ == "__main__":
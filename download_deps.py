@@ -1,5 +1,7 @@
 # download_deps.py
-import urllib.request
+import os
+import http.client
+from urllib.parse import urlsplit
 
 URLS = [
     ('https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js', 'static/js/chart.umd.min.js'),
@@ -7,10 +9,50 @@ URLS = [
     ('https://cdn.jsdelivr.net/npm/chartjs-adapter-date-fns@3.0.0/dist/chartjs-adapter-date-fns.bundle.min.js', 'static/js/chartjs-adapter-date-fns.bundle.min.js')
 ]
 
-for url, path in URLS:
-    print(f"Скачиваю {url} -> {path}")
+# Все файлы с одного CDN — одно TLS-соединение (keep-alive) на все запросы
+_connections = {}
+
+
+def _get(url):
+    parts = urlsplit(url)
+    conn = _connections.get(parts.netloc)
+    if conn is None:
+        conn = _connections[parts.netloc] = http.client.HTTPSConnection(parts.netloc, timeout=30)
+    try:
+        conn.request("GET", parts.path)
+        resp = conn.getresponse()
+        body = resp.read()  # IncompleteRead, если ответ короче Content-Length
+    except Exception:
+        conn.close()  # Следующий запрос откроет соединение заново
+        raise
+    if resp.status != 200:
+        raise RuntimeError(f"HTTP {resp.status} {resp.reason}")
+    return body
+
+
+def fetch(url, path):
+    # Версии в URL закреплены — уже скачанный файл не перекачиваем.
+    # Пишем во временный .part и переименовываем только после полной загрузки,
+    # поэтому оборванная загрузка не оставит файл, который потом будет пропускаться.
+    if os.path.isfile(path) and os.path.getsize(path) > 0:
+        return f"⏭ Уже есть {path}"
+    tmp = path + ".part"
     try:
-        urllib.request.urlretrieve(url, path)
-        print("✅ OK")
+        data = _get(url)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return f"✅ OK {url} -> {path}"
     except Exception as e:
-        print(f"❌ Ошибка: {e}")
\ No newline at end of file
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return f"❌ Ошибка {url}: {e}"
+
+
+os.makedirs("static/js", exist_ok=True)
+
+for url, path in URLS:
+    print(fetch(url, path))
+
+for conn in _connections.values():
+    conn.close()
@@ -1,5 +1,6 @@
 # emulator.py
 import serial
+import struct
 import time
 
 # Настройки
@@ -10,43 +11,45 @@ BAUDRATE = 1200  # Скорость из сниффера
 NUM_OF_PRESSES = 3
 NUM_OF_COUPLS = 7  # Количество термопар на пресс
 
+# Раскладка 66-байтного пакета exchangeGraph(), собирается одним pack():
+#   [0..8*N)  по 8 байт на пресс: давление ×2 + NUM_OF_COUPLS температур
+#   [48..)    уставки температур, [54] номер программы, [60..) время в минутах
+GRAPH_PACKET = struct.Struct(
+    f"<{NUM_OF_PRESSES * 8}B{48 - NUM_OF_PRESSES * 8}x"
+    f"{NUM_OF_PRESSES}B{54 - 48 - NUM_OF_PRESSES}x"
+    f"B{60 - 55}x"
+    f"{NUM_OF_PRESSES}B{66 - 60 - NUM_OF_PRESSES}x"
+)
+# Буфер пакета переиспользуется между вызовами; pack_into перезаписывает все 66 байт
+_BUF = bytearray(GRAPH_PACKET.size)
+
 
 def exchange_graph(ser, pressures, temperatures, t_targets, t_seconds, programs):
     """Формирует и отправляет 66-байтный пакет, как в exchangeGraph()"""
-    buf_data = bytearray(66)
-
+    values = []
     for press_id in range(NUM_OF_PRESSES):
-        # Давление ×2 (с округлением)
-        buf_data[8 * press_id] = int(pressures[press_id] * 2 + 0.5)
-
-        # Температуры (целое число)
-        for iC in range(NUM_OF_COUPLS):
-            temp = temperatures[press_id][iC]
-            buf_data[iC + press_id * 8 + 1] = int(temp + 0.5)
-
-        # Уставка температуры
-        buf_data[48 + press_id] = int(t_targets[press_id] + 0.5)
-
-        # Время в минутах
-        buf_data[60 + press_id] = int(t_seconds[press_id] / 60)
-
-        # Номер программы (заглушка)
-        buf_data[54] = 100
+        # Давление ×2 (с округлением), затем температуры (целое число)
+        values.append(int(pressures[press_id] * 2 + 0.5))
+        values.extend(int(temp + 0.5) for temp in temperatures[press_id][:NUM_OF_COUPLS])
+    # Уставки температуры
+    values.extend(int(t_targets[press_id] + 0.5) for press_id in range(NUM_OF_PRESSES))
+    # Номер программы (заглушка)
+    values.append(100)
+    # Время в минутах
+    values.extend(int(t_seconds[press_id] / 60) for press_id in range(NUM_OF_PRESSES))
+
+    GRAPH_PACKET.pack_into(_BUF, 0, *values)
+    packet = _BUF
 
     # Для ещё большей наглядности
     print("📊 Данные по прессам:")
     for i in range(NUM_OF_PRESSES):
-        print(f"  Пресс {i + 1}: P×2={buf_data[8 * i]}, T={buf_data[8 * i + 1:8 * i + 8]}")
+        print(f"  Пресс {i + 1}: P×2={packet[8 * i]}, T={list(packet[8 * i + 1:8 * i + 8])}")
 
-    # Преобразуем в HEX-строку (для удобства)
-    hex_string = ''.join(f'{b:02X}' for b in buf_data)
-    print(f"📤 HEX: {hex_string}")
+    print(f"📤 HEX: {packet.hex().upper()}")
 
     try:
-        packet = bytes.fromhex(hex_string)
-        for b in packet:
-            ser.write(bytes([b]))
-            time.sleep(0.001)  # 1 мс между байтами
+        ser.write(packet)
 
     except serial.SerialTimeoutException:
         print("❌ Ошибка: превышено время записи (write timeout)")
@@ -1,12 +1,12 @@
 # smart_responder.py
 import serial
 import time
-import binascii
 
 # ——— Настройки ———
 PORT = "COM5"        # Порт, на котором приходит *
 BAUDRATE = 1200      # Как в сниффере
 TIMEOUT = 1
+DEBUG = False        # Печатать каждый принятый кусок (HEX считается только тогда)
 
 # ——— Глобальные переменные ———
 packet_counter = 1   # Сколько раз уже ответили
@@ -27,9 +27,8 @@ def main():
         try:
             if ser.in_waiting > 0:
                 data = ser.read(ser.in_waiting)
-                hex_data = binascii.hexlify(data).decode().upper()
-
-                print(f"[ПРИНЯТО] {data!r} | HEX: {hex_data}")
+                if DEBUG:
+                    print(f"[ПРИНЯТО] {data!r} | HEX: {data.hex().upper()}")
 
                 if b'*' in data:
                     # Определяем длину следующего пакета
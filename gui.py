@@ -1,4 +1,5 @@
 # gui.py
+import functools
 import logging
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
@@ -16,7 +17,7 @@ class SimpleGUI:
     def __init__(self, start_press_func, stop_press_func, emergency_stop_func):
         self.start_press = start_press_func
         self.stop_press = stop_press_func
-        self.emergency_stop = emergency_stop_func
+        self._emergency_stop_cb = emergency_stop_func  # Не emergency_stop: иначе атрибут перекроет метод
         self.root = tk.Tk()
         self.root.title("Управление прессами")
         self.root.geometry("800x600")
@@ -53,28 +54,33 @@ class SimpleGUI:
         self.status_frame.pack(padx=10, pady=5, fill=tk.BOTH)
 
         self.status_labels = {}
+        self.status_vars = {}
+        self.status_texts = {}  # Последний выставленный текст — сравниваем без обращения к Tcl
         for pid in [1, 2, 3]:
-            label = tk.Label(self.status_frame, text=f"Пресс-{pid + 1}: ОСТАНОВЛЕН", font=("Courier", 10))
+            self.status_texts[pid] = f"Пресс-{pid + 1}: ОСТАНОВЛЕН"
+            var = tk.StringVar(self.root, value=self.status_texts[pid])
+            label = tk.Label(self.status_frame, textvariable=var, font=("Courier", 10))
             label.grid(row=pid, column=0, sticky="w", pady=2)
             self.status_labels[pid] = label
+            self.status_vars[pid] = var
 
         # Кнопки
         self.btn_frame = tk.Frame(self.root)
         self.btn_frame.pack(pady=10)
 
-        tk.Button(self.btn_frame, text="Запустить Пресс 2", command=lambda: self.send_command(1)).grid(row=0, column=0,
-                                                                                                       padx=5)
-        tk.Button(self.btn_frame, text="Запустить Пресс 3", command=lambda: self.send_command(2)).grid(row=0, column=1,
-                                                                                                       padx=5)
-        tk.Button(self.btn_frame, text="Запустить Пресс 4", command=lambda: self.send_command(3)).grid(row=0, column=2,
-                                                                                                       padx=5)
+        tk.Button(self.btn_frame, text="Запустить Пресс 2",
+                  command=functools.partial(self.send_command, 1)).grid(row=0, column=0, padx=5)
+        tk.Button(self.btn_frame, text="Запустить Пресс 3",
+                  command=functools.partial(self.send_command, 2)).grid(row=0, column=1, padx=5)
+        tk.Button(self.btn_frame, text="Запустить Пресс 4",
+                  command=functools.partial(self.send_command, 3)).grid(row=0, column=2, padx=5)
 
-        tk.Button(self.btn_frame, text="Остановить Пресс 2", command=lambda: self.stop_command(1)).grid(row=1, column=0,
-                                                                                                        padx=5, pady=2)
-        tk.Button(self.btn_frame, text="Остановить Пресс 3", command=lambda: self.stop_command(2)).grid(row=1, column=1,
-                                                                                                        padx=5, pady=2)
-        tk.Button(self.btn_frame, text="Остановить Пресс 4", command=lambda: self.stop_command(3)).grid(row=1, column=2,
-                                                                                                        padx=5, pady=2)
+        tk.Button(self.btn_frame, text="Остановить Пресс 2",
+                  command=functools.partial(self.stop_command, 1)).grid(row=1, column=0, padx=5, pady=2)
+        tk.Button(self.btn_frame, text="Остановить Пресс 3",
+                  command=functools.partial(self.stop_command, 2)).grid(row=1, column=1, padx=5, pady=2)
+        tk.Button(self.btn_frame, text="Остановить Пресс 4",
+                  command=functools.partial(self.stop_command, 3)).grid(row=1, column=2, padx=5, pady=2)
 
         tk.Button(self.btn_frame, text="Аварийная остановка всех", command=self.emergency_stop,
                   bg="red", fg="white").grid(row=2, column=0, columnspan=3, pady=10)
@@ -94,7 +100,7 @@ class SimpleGUI:
 
     def emergency_stop(self):
         if messagebox.askyesno("Подтверждение", "Точно аварийно остановить все прессы?"):
-            self.emergency_stop()
+            self._emergency_stop_cb()
 
     def update_status(self):
         if not self.running:
@@ -117,7 +123,10 @@ class SimpleGUI:
             current_step = max(temp_step.get("index", -1), press_step.get("index", -1)) + 1
 
             step_str = f" | Шаг {current_step}" if current_step > 0 else ""
-            self.status_labels[pid].config(text=f"Пресс-{pid + 1}: {status}{step_str}")
+            text = f"Пресс-{pid + 1}: {status}{step_str}"
+            if self.status_texts[pid] != text:
+                self.status_texts[pid] = text
+                self.status_vars[pid].set(text)
 
         self.root.after(1000, self.update_status)
 
@@ -140,34 +149,36 @@ class SimpleGUI:
         self.root.mainloop()
 
 
-import queue  # <-- Добавь в начало файла
+from collections import deque
 
 class TextHandler(logging.Handler):
+    BATCH = 200        # Максимум сообщений за один проход poll
+    MAX_LINES = 1000   # Сколько строк держим в окне логов
+
     def __init__(self, text_widget):
         super().__init__()
         self.text_widget = text_widget
-        self.queue = queue.Queue()
+        # Один писатель (logging) и один читатель (Tk): append/popleft у deque потокобезопасны.
+        # При переполнении старые сообщения вытесняются.
+        self.queue = deque(maxlen=1000)
         self.text_widget.after(100, self.poll)  # Каждые 100мс проверяем очередь
 
     def emit(self, record):
-        msg = self.format(record)
-        try:
-            self.queue.put_nowait(msg)
-        except queue.Full:
-            pass  # Очередь переполнена — пропускаем сообщение
+        self.queue.append(self.format(record))
 
     def poll(self):
         """Вызывается из главного потока Tk"""
-        while True:
-            try:
-                msg = self.queue.get_nowait()
-            except queue.Empty:
-                break
-            else:
-                self.text_widget.configure(state='normal')
-                self.text_widget.insert(tk.END, msg + '\n')
-                self.text_widget.see(tk.END)
-                self.text_widget.configure(state='disabled')
+        msgs = []
+        while self.queue and len(msgs) < self.BATCH:
+            msgs.append(self.queue.popleft())
+        if msgs:
+            # Одна вставка на всю пачку вместо вставки на каждое сообщение
+            w = self.text_widget
+            w.configure(state='normal')
+            w.insert(tk.END, '\n'.join(msgs) + '\n')
+            w.delete("1.0", f"end-{self.MAX_LINES} lines")  # Не даём тексту расти бесконечно
+            w.see(tk.END)
+            w.configure(state='disabled')
         # Запланировать следующую проверку
         if getattr(self, 'polling', True):
             self.text_widget.after(100, self.poll)
@@ -5,27 +5,110 @@ import time
 import logging
 import threading
 import os
+import mmap
 import atexit
+import functools
+import queue
+import selectors
+import subprocess
 import argparse  # <-- Добавь в начало файла
-from typing import Dict, Any
+from typing import Dict, Any, Tuple, Optional, NamedTuple
 
 from core.graph_transmitter import GraphTransmitter
 from core.hardware_interface import HardwareInterface
 from core.hardware_daemon import HardwareDaemon
-from core.web_interface import WebInterface
-from core.control_manager import ControlManager
 from core.global_state import state
-from logging.handlers import TimedRotatingFileHandler
+from core.json_util import loads as _json_loads
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+
+
+class ProgramSummary(NamedTuple):
+    """Сводка программы пресса для меню — считается один раз при загрузке файла."""
+    temp_steps: int
+    press_steps: int
+
 
 # Глобальные переменные
 hardware_interface: HardwareInterface = None
 # press_controllers: Dict[int, PressController] = {}
-running = True
+_shutdown = threading.Event()  # Установлен — система останавливается
 daemon: HardwareDaemon = None  # будет инициализирован в main()
 control_managers = {}
+_CM_LIST: Tuple[Any, ...] = ()  # ControlManager'ы по порядку _PRESS_IDS — заполняется в main()
+_json_cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}  # path → ((mtime_ns, size), данные)
+_program_summaries: Dict[str, Tuple[Tuple[int, int], ProgramSummary]] = {}  # path → ((mtime_ns, size), сводка)
+_log_listener: Optional[QueueListener] = None  # Пишет app.log в своём потоке
+_wakeup_pipe: Optional[Tuple[int, int]] = None  # Будит command_loop при остановке (только не-Windows)
+_stdin_buf = bytearray()  # Прочитанные из fd stdin, но ещё не отданные строки
+_stdin_sel: Optional[selectors.BaseSelector] = None  # Селектор command_loop — все запросы ввода идут через него
+
+# Идентификаторы прессов и модулей
+_PRESS_IDS = (1, 2, 3)
+_DI_MODS_ALL = ("37", "38", "39")
+_DO_MODS_ALL = ("31", "32", "33", "34")
+_EMERGENCY_DO_MODS = ("31", "32", "34", "35", "36")
+_FINAL_DO_LOW = [f"#{mod}0000" for mod in _DO_MODS_ALL]   # Выключение при остановке: младшие байты
+_FINAL_DO_HIGH = [f"#{mod}0B00" for mod in _DO_MODS_ALL]  # ... и старшие
+
+# Статичные тексты консоли — собираются один раз и выводятся одной записью
+_MENU = (
+    "\n" + "=" * 50 + "\n"
+    "🔧 УПРАВЛЕНИЕ ПРЕССАМИ\n"
+    + "=" * 50 + "\n"
+    "1 — Запустить пресс 2\n"
+    "2 — Запустить пресс 3\n"
+    "3 — Запустить пресс \n"
+    "4 — Остановить пресс 2\n"
+    "5 — Остановить пресс 3\n"
+    "6 — Остановить пресс 4\n"
+    "7 — Аварийная остановка всех\n"
+    "8 — Показать программы\n"
+    "9 — Показать статус\n"
+    "0 — Выход\n"
+    + "-" * 50 + "\n"
+)
+_STATE_BANNER = "\n" + "=" * 60 + "\n📊 СОСТОЯНИЕ СИСТЕМЫ\n" + "=" * 60 + "\n"
+_STATE_FULL_BANNER = "\n" + "=" * 70 + "\n📊 СОСТОЯНИЕ СИСТЕМЫ\n" + "=" * 70 + "\n"
+
+# Ключи state по прессам: _PK[pid]["paused"] == "press_{pid}_paused"
+_PK = {
+    pid: {suffix: f"press_{pid}_{suffix}" for suffix in (
+        "paused", "completed", "current_step_temperature", "current_step_pressure",
+        "temps", "target_temp", "step_status_temperature",
+        "pressure", "target_pressure", "step_status_pressure",
+    )}
+    for pid in _PRESS_IDS
+}
+# 16-битное слово DI/DO в виде строки бит
+_bin16 = "{:016b}".format
+
+_PRESS_PREFIXES = tuple(f"press_{pid}_" for pid in _PRESS_IDS)
+_PRESS_BY_PREFIX = {pfx: pid for pid, pfx in zip(_PRESS_IDS, _PRESS_PREFIXES)}  # "press_1_" → 1
+_PREFIX_LEN = len(_PRESS_PREFIXES[0])
+_DEFAULT_TEMPS = [None] * 8  # Только для чтения — общий для всех вызовов
+
+# Ключи state, которые читают show_status / print_structured_state — одним state.get_many
+_STATUS_KEYS = tuple(
+    _PK[pid][suffix]
+    for pid in _PRESS_IDS
+    for suffix in ("paused", "completed", "current_step_temperature", "current_step_pressure")
+)
+_STRUCTURED_STATE_KEYS = ("di_module_37", "di_module_38") + tuple(
+    f"do_state_{mod}" for mod in _DO_MODS_ALL
+) + tuple(
+    _PK[pid][suffix]
+    for pid in _PRESS_IDS
+    for suffix in ("temps", "target_temp", "step_status_temperature", "pressure", "target_pressure",
+                   "step_status_pressure", "current_step_temperature", "current_step_pressure")
+)
 
 
 def setup_main_logger():
+    global _log_listener
+    # Повторный вызов не должен добавлять второй файловый хендлер
+    if _log_listener is not None:
+        return
+    root = logging.getLogger()
     os.makedirs("logs", exist_ok=True)
     log_file = "logs/app.log"
 
@@ -42,21 +125,60 @@ def setup_main_logger():
     formatter = logging.Formatter('%(asctime)s [MAIN] %(levelname)s: %(message)s')
     handler.setFormatter(formatter)
 
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
+    # Запись в файл — в потоке QueueListener, вызывающий поток только кладёт запись в очередь
+    log_queue = queue.Queue(-1)
+    _log_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _log_listener.start()
 
-    # Убедимся, что нет дублирующих хендлеров
-    if not logging.getLogger().hasHandlers():
-        logging.getLogger().addHandler(handler)
+    root.setLevel(logging.INFO)
+    root.addHandler(QueueHandler(log_queue))
     logging.info("][ " * 35)
     logging.info("M Логирование инициализировано")
 
 
+def load_json_cached(path: str, st: Optional[os.stat_result] = None) -> Any:
+    """
+    Читает JSON, повторно разбирая файл только если он изменился (mtime/размер).
+    st — уже полученный stat файла (например, DirEntry.stat()), чтобы не делать его повторно.
+    Возвращает общий для всех вызовов объект — не изменяйте его.
+    """
+    if st is None:
+        st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _json_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(path, "rb") as f:
+        # Разбираем прямо из отображения файла, без копии в буфер чтения
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(mm) as view:
+                data = _json_loads(view)
+    _json_cache[path] = (stamp, data)
+    return data
+
+
+def load_program_summary(path: str, st: Optional[os.stat_result] = None) -> ProgramSummary:
+    """Число шагов программы; файл разбирается и обходится только при изменении."""
+    if st is None:
+        st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _program_summaries.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    prog = load_json_cached(path, st)
+    summary = ProgramSummary(
+        len(prog.get("temp_program", [])),
+        len(prog.get("pressure_program", [])),
+    )
+    _program_summaries[path] = (stamp, summary)
+    return summary
+
+
 def load_system_config() -> Dict[str, Any]:
     try:
-        with open("config/system.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+        return load_json_cached("config/system.json")
     except FileNotFoundError:
         logging.critical("M Файл config/system.json не найден.")
         exit(1)
@@ -65,10 +187,10 @@ def load_system_config() -> Dict[str, Any]:
         exit(1)
 
 
-def initialize_hardware() -> HardwareInterface:
+def initialize_hardware(config: Dict[str, Any]) -> HardwareInterface:
     global hardware_interface
     try:
-        hardware_interface = HardwareInterface("config/system.json")
+        hardware_interface = HardwareInterface("config/system.json", config=config)
         logging.info("M Интерфейс с оборудованием инициализирован.")
         return hardware_interface
     except Exception as e:
@@ -103,20 +225,21 @@ def stop_press(press_id: int, emergency: bool = False):
 
 
 def show_status():
+    data = state.get_many(_STATUS_KEYS)
     print("\n" + "=" * 50)
-    for pid in range(1, 4):
+    for pid in _PRESS_IDS:
         # Читаем из state — единая точка истины
-        paused = state.get(f"press_{pid}_paused", False)
-        completed = state.get(f"press_{pid}_completed", False)
+        paused = data.get(_PK[pid]["paused"], False)
+        completed = data.get(_PK[pid]["completed"], False)
 
-        temp_step = state.get(f"press_{pid}_current_step_temperature", {})
-        press_step = state.get(f"press_{pid}_current_step_pressure", {})
+        temp_step = data.get(_PK[pid]["current_step_temperature"], {})
+        press_step = data.get(_PK[pid]["current_step_pressure"], {})
 
         index_temp = temp_step.get("index", -1)
         index_press = press_step.get("index", -1)
         current_step = max(index_temp, index_press) + 1 if max(index_temp, index_press) >= 0 else "-"
 
-        if running:
+        if not _shutdown.is_set():
             status = "ПАУЗА" if paused else "РАБОТАЕТ"
             print(f"Пресс-{pid + 1}: {status} | Шаг {current_step}")
         else:
@@ -129,15 +252,18 @@ def show_status():
 
 def show_programs():
     print("\n📋 Доступные программы:")
-    for pid in range(1, 4):
-        path = f"programs/press{pid}.json"
-        if os.path.exists(path):
+    # Один проход по каталогу вместо exists() + stat() на каждый файл
+    try:
+        with os.scandir("programs") as it:
+            entries = {e.name: e for e in it}
+    except OSError:
+        entries = {}
+    for pid in _PRESS_IDS:
+        entry = entries.get(f"press{pid}.json")
+        if entry is not None:
             try:
-                with open(path, "r", encoding="utf-8") as f:
-                    prog = json.load(f)
-                # 🔢 Считаем шаги
-                temp_steps = len(prog.get("temp_program", []))
-                press_steps = len(prog.get("pressure_program", []))
+                # 🔢 Шаги посчитаны при загрузке файла
+                temp_steps, press_steps = load_program_summary(entry.path, entry.stat())
                 total = temp_steps + press_steps
                 print(f"  Пресс {pid + 1}: {total} шагов (T:{temp_steps}, P:{press_steps})")
             except Exception as e:
@@ -146,117 +272,86 @@ def show_programs():
             print(f"  Пресс {pid + 1}: ❌ файл не найден")
 
 
+def _make_stdin_selector() -> Optional[selectors.BaseSelector]:
+    """Селектор на stdin + pipe пробуждения. На Windows select() не работает с консолью — None."""
+    global _wakeup_pipe
+    if os.name == "nt":
+        return None
+    sel = selectors.DefaultSelector()
+    try:
+        sel.register(sys.stdin.fileno(), selectors.EVENT_READ)
+    except (OSError, ValueError):
+        # stdin — обычный файл или закрыт: epoll такое не принимает, читаем через input()
+        sel.close()
+        return None
+    pipe = os.pipe()
+    sel.register(pipe[0], selectors.EVENT_READ)
+    _wakeup_pipe = pipe
+    return sel
+
+
+def _read_command(sel: Optional[selectors.BaseSelector], prompt: str) -> Optional[str]:
+    """Ждёт строку с консоли. None — если пришёл сигнал остановки."""
+    if sel is None:
+        return input(prompt)
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    # Читаем fd напрямую, без буфера sys.stdin: иначе строки, пришедшие одной пачкой,
+    # застревали бы в буфере, пока селектор считает fd пустым
+    fd = sys.stdin.fileno()
+    while b"\n" not in _stdin_buf:
+        ready = [key.fileobj for key, _ in sel.select()]
+        if _wakeup_pipe[0] in ready:
+            return None
+        chunk = os.read(fd, 4096)
+        if not chunk:
+            if not _stdin_buf:
+                raise EOFError
+            break  # Последняя строка без перевода строки
+        _stdin_buf.extend(chunk)
+    end = _stdin_buf.find(b"\n") + 1 or len(_stdin_buf)
+    line = bytes(_stdin_buf[:end])
+    del _stdin_buf[:end]
+    return line.decode(sys.stdin.encoding or "utf-8", errors="replace")
+
+
 def command_loop():
-    time.sleep(0.19)
-    global running
-    while running:
-        print("\n" + "=" * 50)
-        print("🔧 УПРАВЛЕНИЕ ПРЕССАМИ")
-        print("=" * 50)
-        print("1 — Запустить пресс 2")
-        print("2 — Запустить пресс 3")
-        print("3 — Запустить пресс ")
-        print("4 — Остановить пресс 2")
-        print("5 — Остановить пресс 3")
-        print("6 — Остановить пресс 4")
-        print("7 — Аварийная остановка всех")
-        print("8 — Показать программы")
-        print("9 — Показать статус")
-        print("0 — Выход")
-        print("-" * 50)
+    global _stdin_sel
+    # Меню — после первого цикла ControlManager'ов, чтобы их стартовые логи не перемешались с ним
+    for cm in _CM_LIST:
+        cm.ready.wait(timeout=2.0)
+    sel = _stdin_sel = _make_stdin_selector()
+    while not _shutdown.is_set():
+        sys.stdout.write(_MENU)
 
         try:
-            cmd = input("Выберите действие: ").strip()
-
-            if cmd == "1":
-                start_press(1)
-            elif cmd == "2":
-                start_press(2)
-            elif cmd == "3":
-                start_press(3)
-            elif cmd == "4":
-                stop_press(1)
-            elif cmd == "5":
-                stop_press(2)
-            elif cmd == "6":
-                stop_press(3)
-            elif cmd == "7":
-                logging.warning("M Аварийная остановка всех прессов!")
-
-                # 1. Остановить все PressController через ControlManager
-                for pid in [1, 2, 3]:
-                    cm = control_managers.get(pid)
-                    if cm and cm.press_controller and cm.press_controller.running:
-                        cm.press_controller.emergency_stop()
-                        cm.press_controller.join(timeout=0.5)
-                        logging.info(f"M Пресс-{pid + 1}: emergency_stop вызван через ControlManager")
-
-                for mod in ["31", "32", "34", "35", "36"]:
-                    state.write_do(mod, 0, 0)
-                    state.set(f"do_state_{mod}", 0)
-                    logging.info(f"M Аварийно выключено: DO-{mod}")
-
-                # 3. Сбросить уставки
-                for pid in [1, 2, 3]:
-                    state.set(f"press_{pid}_target_temp", None)
-                    state.set(f"press_{pid}_target_pressure", 0.0)
-
-                logging.warning("M Все прессы аварийно остановлены.")
-            elif cmd == "8":
-                show_programs()
-            elif cmd == "9":
-                show_status()
-            elif cmd == "11":
-                if state.get(f"press_drawing", False):
-                    state.set(f"press_drawing", False)
-                    print("Рисование выключено")
-                else:
-                    state.set(f"press_drawing", True)
-                    print("Рисование включено")
-            elif cmd == "33":
-                print("ВСЁ состояние системы:")
-                print_structured_state()
-            elif cmd == "34":
-                print("ВСЁ состояние системы:")
-                print(state.get_all())
-            elif cmd == "35":
-                print("ВСЁ состояние системы:")
-                print_structured_state_full()
-            elif cmd == "44":
-                print("PID:")
-                for pid in [1, 2, 3]:
-                    c = []
-                    for zone in range(8):
-                        c.append(f"|zone {zone}:")
-                        c.append(state.get(f"press_{pid}_temp{zone}_pid", "NaN"))
-                    c.append(f"|pressure ")
-                    c.append(state.get(f"press_{pid}_valve_pid", "NaN"))
-                    print(f"Press {pid} {c}")
-            elif cmd == "d" or cmd == "10":
-                print("\n🔧 Запуск диагностики оборудования...")
-                try:
-                    import subprocess
-                    subprocess.run([sys.executable, "diagnose.py"], check=True)
-                except Exception as e:
-                    print(f"❌ Ошибка запуска diagnose.py: {e}")
-                input("Нажмите Enter...")
-            elif cmd == "0":
-                running = False
+            cmd = _read_command(sel, "Выберите действие: ")
+            if cmd is None:
+                break
+            cmd = cmd.strip()
+
+            handler = _COMMANDS.get(cmd)
+            if handler:
+                handler()
             else:
                 print("❌ Неверный выбор")
         except (EOFError, KeyboardInterrupt):
-            running = False
+            _shutdown.set()
             break
 
 
 def cleanup():
-    global running, daemon, hardware_interface, control_managers
-    running = False
+    global daemon, hardware_interface, control_managers
+    _shutdown.set()
+    if _wakeup_pipe is not None:
+        os.write(_wakeup_pipe[1], b"\0")  # Разбудить command_loop
     logging.info("M Выполняется остановка системы...")
 
-    # Остановка ControlManager
-    for cm in control_managers.values():
+    # Остановка ControlManager: снимок, чтобы не итерировать dict, который может меняться
+    cms = tuple(control_managers.values())
+    for cm in cms:
         cm.stop()
+    for cm in cms:
         cm.join(timeout=1.0)
 
     # Остановка демона
@@ -266,12 +361,11 @@ def cleanup():
 
     # Финальная синхронизация: выключить всё
     if hardware_interface:
-        do_modules = ["31", "32", "33", "34"]
-        for mod in do_modules:
-            hardware_interface._send_command(f"#{mod}0000")
-            time.sleep(0.05)
-            hardware_interface._send_command(f"#{mod}0B00")
-            logging.info(f"M Финальное выключение DO-{mod}")
+        # Сначала младшие байты всех модулей, одна пауза, затем старшие
+        hardware_interface.send_commands(_FINAL_DO_LOW)
+        time.sleep(0.05)
+        hardware_interface.send_commands(_FINAL_DO_HIGH)
+        logging.info(f"M Финальное выключение DO-{', '.join(_DO_MODS_ALL)}")
 
     # Закрытие интерфейса
     if hardware_interface is not None:
@@ -279,44 +373,47 @@ def cleanup():
 
     logging.info("M Система остановлена.")
 
+    # Последним: дописать очередь логов в файл
+    if _log_listener is not None:
+        _log_listener.stop()
+
 
 def print_structured_state():
-    print("\n" + "=" * 60)
-    print("📊 СОСТОЯНИЕ СИСТЕМЫ")
-    print("=" * 60)
+    data = state.get_many(_STRUCTURED_STATE_KEYS)
+    sys.stdout.write(_STATE_BANNER)
 
     # --- ДИСКРЕТНЫЕ ВХОДЫ ---
     print("\n🔌 ДИСКРЕТНЫЕ ВХОДЫ")
-    print(f"  DI 37 (кнопки):     {bin(state.get('di_module_37', 0))[2:].zfill(16)}")
-    print(f"  DI 38 (концевики):  {bin(state.get('di_module_38', 0))[2:].zfill(16)}")
+    print(f"  DI 37 (кнопки):     {_bin16(data.get('di_module_37', 0))}")
+    print(f"  DI 38 (концевики):  {_bin16(data.get('di_module_38', 0))}")
 
     # --- ТЕМПЕРАТУРА ---
     print("\n🌡️  ТЕМПЕРАТУРА")
-    for pid in [1, 2, 3]:
-        temps = state.get(f"press_{pid}_temps", [None] * 8)
-        target = state.get(f"press_{pid}_target_temp", "N/A")
-        status_temp = state.get(f"press_{pid}_step_status_temperature", "stopped")
+    for pid in _PRESS_IDS:
+        temps = data.get(_PK[pid]["temps"], _DEFAULT_TEMPS)
+        target = data.get(_PK[pid]["target_temp"], "N/A")
+        status_temp = data.get(_PK[pid]["step_status_temperature"], "stopped")
         print(f"  Пресс-{pid + 1}: {temps[:7]} | Уставка: {target}°C | Статус: {status_temp}")
 
     # --- ДАВЛЕНИЕ ---
     print("\n⚙️  ДАВЛЕНИЕ")
-    for pid in [1, 2, 3]:
-        pressure = state.get(f"press_{pid}_pressure", "N/A")
-        target = state.get(f"press_{pid}_target_pressure", "N/A")
-        status_press = state.get(f"press_{pid}_step_status_pressure", "stopped")
+    for pid in _PRESS_IDS:
+        pressure = data.get(_PK[pid]["pressure"], "N/A")
+        target = data.get(_PK[pid]["target_pressure"], "N/A")
+        status_press = data.get(_PK[pid]["step_status_pressure"], "stopped")
         print(f"  Пресс-{pid + 1}: {pressure} МПа → {target} МПа | Статус: {status_press}")
 
     # --- ВЫХОДЫ (DO) ---
     print("\n🔌 ВЫХОДЫ (DO)")
-    for mod in [31, 32, 33, 34]:
-        val = state.get(f"do_state_{mod}", 0)
-        print(f"  DO {mod}: {bin(val)[2:].zfill(16)} ({val})")
+    for mod in _DO_MODS_ALL:
+        val = data.get(f"do_state_{mod}", 0)
+        print(f"  DO {mod}: {_bin16(val)} ({val})")
 
     # --- ТЕКУЩИЕ ШАГИ ---
     print("\n🔄 ТЕКУЩИЕ ШАГИ")
-    for pid in [1, 2, 3]:
-        temp_step = state.get(f"press_{pid}_current_step_temperature", {})
-        press_step = state.get(f"press_{pid}_current_step_pressure", {})
+    for pid in _PRESS_IDS:
+        temp_step = data.get(_PK[pid]["current_step_temperature"], {})
+        press_step = data.get(_PK[pid]["current_step_pressure"], {})
         if temp_step or press_step:
             print(f"  Пресс-{pid + 1}:")
             if temp_step:
@@ -330,24 +427,26 @@ def print_structured_state():
 
 
 def print_structured_state_full():
-    print("\n" + "=" * 70)
-    print("📊 СОСТОЯНИЕ СИСТЕМЫ")
-    print("=" * 70)
+    sys.stdout.write(_STATE_FULL_BANNER)
 
     data = state.get_all()
 
+    # Какие прессы есть в state — один проход, по ключу один срез и поиск в dict
+    present = {_PRESS_BY_PREFIX.get(k[:_PREFIX_LEN]) for k in data}
+
     # --- ПРЕССЫ ---
-    for pid in [1, 2, 3]:
-        if not any(k.startswith(f"press_{pid}_") for k in data):
+    for pid in _PRESS_IDS:
+        if pid not in present:
             continue
 
+        pfx = _PRESS_PREFIXES[pid - 1]  # "press_{pid}_"
         print(f"\n🔧 ПРЕСС-{pid + 1}")
 
         # Статус
-        paused = data.get(f"press_{pid}_paused", False)
-        completed = data.get(f"press_{pid}_completed", False)
+        paused = data.get(pfx + "paused", False)
+        completed = data.get(pfx + "completed", False)
 
-        if running:
+        if not _shutdown.is_set():
             status = "⏸️ ПАУЗА" if paused else "▶️ РАБОТАЕТ"
         elif completed:
             status = "✅ ЗАВЕРШЁН"
@@ -357,42 +456,42 @@ def print_structured_state_full():
         print(f"  Статус: {status}")
 
         # Температура
-        temps = data.get(f"press_{pid}_temps", [None] * 8)[:7]
-        target_temp = data.get(f"press_{pid}_target_temp", "N/A")
-        step_temp = data.get(f"press_{pid}_current_step_temperature", {})
+        temps = data.get(pfx + "temps", _DEFAULT_TEMPS)[:7]
+        target_temp = data.get(pfx + "target_temp", "N/A")
+        step_temp = data.get(pfx + "current_step_temperature", {})
         step_temp_type = step_temp.get("type", "—")
         step_temp_index = step_temp.get("index", "-")
-        step_time_temp = data.get(f"press_{pid}_step_elapsed_temperature", 0.0)
+        step_time_temp = data.get(pfx + "step_elapsed_temperature", 0.0)
 
         print(f"  Темп:     {format_temps(temps)}")
         print(f"  Уставка:  {target_temp}°C | Шаг {step_temp_index}: {step_temp_type} ({format_time(step_time_temp)})")
 
         # Давление
-        pressure = data.get(f"press_{pid}_pressure", "N/A")
-        target_pressure = data.get(f"press_{pid}_target_pressure", "N/A")
-        step_press = data.get(f"press_{pid}_current_step_pressure", {})
+        pressure = data.get(pfx + "pressure", "N/A")
+        target_pressure = data.get(pfx + "target_pressure", "N/A")
+        step_press = data.get(pfx + "current_step_pressure", {})
         step_press_type = step_press.get("type", "—")
         step_press_index = step_press.get("index", "-")
-        step_time_press = data.get(f"press_{pid}_step_elapsed_pressure", 0.0)
+        step_time_press = data.get(pfx + "step_elapsed_pressure", 0.0)
 
         print(f"  Давление: {pressure} МПа → {target_pressure} МПа")
         print(f"            Шаг {step_press_index}: {step_press_type} ({format_time(step_time_press)})")
 
         # Цикл
-        cycle_elapsed = data.get(f"press_{pid}_cycle_elapsed", 0.0)
+        cycle_elapsed = data.get(pfx + "cycle_elapsed", 0.0)
         print(f"  Время цикла: {format_time(cycle_elapsed)}")
 
     # --- ВХОДЫ (DI) ---
     print(f"\n🔌 ВХОДЫ (DI)")
-    for mod in ["37", "38", "39"]:
+    for mod in _DI_MODS_ALL:
         val = data.get(f"di_module_{mod}", 0)
-        print(f"  DI-{mod}: {val:04X} ({bin(val)[2:].zfill(16)})")
+        print(f"  DI-{mod}: {val:04X} ({_bin16(val)})")
 
     # --- ВЫХОДЫ (DO) ---
     print(f"\n⚙️  ВЫХОДЫ (DO)")
-    for mod in ["31", "32", "33", "34"]:
+    for mod in _DO_MODS_ALL:
         val = data.get(f"do_state_{mod}", 0)
-        print(f"  DO-{mod}: {val:04X} ({bin(val)[2:].zfill(16)})")
+        print(f"  DO-{mod}: {val:04X} ({_bin16(val)})")
 
     # --- ОЧЕРЕДИ ---
     urgent_do = data.get("urgent_do", {})
@@ -437,14 +536,114 @@ atexit.register(cleanup)
 
 
 def emergency_stop_all():
-    for pid in [1, 2, 3]:
-        cm = control_managers.get(pid)
-        if cm:
-            cm.emergency_stop()
+    for cm in _CM_LIST:
+        cm.emergency_stop()
+
+
+# --- Команды консольного меню ---
+def emergency_stop_console():
+    logging.warning("M Аварийная остановка всех прессов!")
+
+    # 1. Остановить все PressController через ControlManager:
+    #    сначала сигнал всем, потом ожидание — прессы останавливаются одновременно
+    stopping = []
+    for cm in _CM_LIST:
+        if cm.press_controller and cm.press_controller.running:
+            cm.press_controller.emergency_stop()
+            stopping.append((cm.press_id, cm.press_controller))
+
+    deadline = time.monotonic() + 0.5
+    for pid, pc in stopping:
+        pc.join(timeout=max(0.0, deadline - time.monotonic()))
+        logging.info(f"M Пресс-{pid + 1}: emergency_stop вызван через ControlManager")
+
+    for mod in _EMERGENCY_DO_MODS:
+        state.write_do(mod, 0, 0)
+        state.set(f"do_state_{mod}", 0)
+        logging.info(f"M Аварийно выключено: DO-{mod}")
+
+    # 3. Сбросить уставки
+    for pid in _PRESS_IDS:
+        state.set(_PK[pid]["target_temp"], None)
+        state.set(_PK[pid]["target_pressure"], 0.0)
+
+    logging.warning("M Все прессы аварийно остановлены.")
+
+
+def toggle_drawing():
+    if state.get(f"press_drawing", False):
+        state.set(f"press_drawing", False)
+        print("Рисование выключено")
+    else:
+        state.set(f"press_drawing", True)
+        print("Рисование включено")
+
+
+def show_state_structured():
+    print("ВСЁ состояние системы:")
+    print_structured_state()
+
+
+def show_state_raw():
+    print("ВСЁ состояние системы:")
+    print(state.get_all())
+
+
+def show_state_full():
+    print("ВСЁ состояние системы:")
+    print_structured_state_full()
+
+
+def show_pid_state():
+    print("PID:")
+    for pid in _PRESS_IDS:
+        c = []
+        for zone in range(8):
+            c.append(f"|zone {zone}:")
+            c.append(state.get(f"press_{pid}_temp{zone}_pid", "NaN"))
+        c.append(f"|pressure ")
+        c.append(state.get(f"press_{pid}_valve_pid", "NaN"))
+        print(f"Press {pid} {c}")
+
+
+def run_diagnostics():
+    print("\n🔧 Запуск диагностики оборудования...")
+    try:
+        subprocess.run([sys.executable, "diagnose.py"], check=True)
+    except Exception as e:
+        print(f"❌ Ошибка запуска diagnose.py: {e}")
+    # Через тот же _read_command: строки, уже прочитанные из fd, input() бы не увидел
+    if _read_command(_stdin_sel, "Нажмите Enter...") is None:
+        return  # Пришёл сигнал остановки
+
+
+def request_exit():
+    _shutdown.set()
+
+
+_COMMANDS = {
+    "1": functools.partial(start_press, 1),
+    "2": functools.partial(start_press, 2),
+    "3": functools.partial(start_press, 3),
+    "4": functools.partial(stop_press, 1),
+    "5": functools.partial(stop_press, 2),
+    "6": functools.partial(stop_press, 3),
+    "7": emergency_stop_console,
+    "8": show_programs,
+    "9": show_status,
+    "11": toggle_drawing,
+    "33": show_state_structured,
+    "34": show_state_raw,
+    "35": show_state_full,
+    "44": show_pid_state,
+    "d": run_diagnostics,
+    "10": run_diagnostics,
+    "0": request_exit,
+}
 
 
 def main():
-    global hardware_interface, daemon, hw_config, control_managers
+    global hardware_interface, daemon, hw_config, control_managers, _CM_LIST
 
     # Парсим аргументы
     parser = argparse.ArgumentParser(description="Управление прессами")
@@ -452,26 +651,29 @@ def main():
     parser.add_argument("--console", action="store_true", help="Принудительно запустить консольный режим")
     args = parser.parse_args()
 
+    # Тяжёлые модули (Flask, контроллеры) грузим только при реальном запуске, не для --help
+    from core.web_interface import WebInterface
+    from core.control_manager import ControlManager
+
     setup_main_logger()
     config = load_system_config()
     logging.info(f"M Система запущена в режиме: {config['mode']}")
 
-    hardware_interface = initialize_hardware()
+    hardware_interface = initialize_hardware(config)
 
-    config_path = os.path.join("config", "hardware_config.json")
-    with open(config_path, "r", encoding="utf-8") as f:
-        hw_config = json.load(f)
+    hw_config = load_json_cached(os.path.join("config", "hardware_config.json"))
 
     daemon = HardwareDaemon(hardware_interface)
     daemon.start()
     logging.info("M HardwareDaemon запущен")
-    time.sleep(0.1)
+    daemon.ready.wait(timeout=2.0)
 
     # Запуск ControlManager'ов
-    for pid in [1, 2, 3]:
+    for pid in _PRESS_IDS:
         cm = ControlManager(press_id=pid, config=hw_config)
         cm.start()
         control_managers[pid] = cm
+    _CM_LIST = tuple(control_managers[pid] for pid in _PRESS_IDS)
 
     # Выбор режима
     if args.gui and not args.console:
@@ -491,7 +693,7 @@ def main():
             stop_press(press_id, emergency=False)
 
         def emergency_stop_local():
-            for pid in [1, 2, 3]:
+            for pid in _PRESS_IDS:
                 stop_press(pid, emergency=True)
 
         try:
@@ -525,9 +727,11 @@ def main():
         graph_tx.start()
 
         try:
-            while running:
-                time.sleep(0.1)
+            # На Windows wait() без таймаута не прерывается Ctrl+C — там просыпаемся раз в секунду
+            while not _shutdown.wait(1.0 if os.name == "nt" else None):
+                pass
         except KeyboardInterrupt:
+            _shutdown.set()  # command_loop и прочие ожидающие видят остановку сразу
             logging.info("M Получен сигнал завершения (Ctrl+C).")
 
 
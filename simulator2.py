@@ -24,14 +24,14 @@ devices = {
     18: {"model": "I-7018", "ai": [19.8, 19.6, 19.8, 20.2, 17.7, 21.8, 19.4, 29.8]},
     19: {"model": "I-7018", "ai": [20.1, 19.9, 20.1, 20.4, 20.9, 21.6, 21.7, 27.5]},
 
-    # Цифровые выходы и входы — как строки, как у тебя было
-    31: {"model": "I-7045", "do": "0000", "di": "0111"},  # младший и старший байт
-    32: {"model": "I-7045", "do": "0000", "di": "000C"},
-    33: {"model": "I-7045", "do": "0000", "di": "0008"},
-    34: {"model": "I-7045", "do": "0000", "di": "0003"},
-    37: {"model": "I-7051", "di": "0111"},
-    38: {"model": "I-7051", "di": "0007"},
-    39: {"model": "I-7051", "di": "0280"}
+    # Цифровые выходы и входы — 16-битные слова (HEX только в ответах)
+    31: {"model": "I-7045", "do": 0x0000, "di": 0x0111},  # младший и старший байт
+    32: {"model": "I-7045", "do": 0x0000, "di": 0x000C},
+    33: {"model": "I-7045", "do": 0x0000, "di": 0x0008},
+    34: {"model": "I-7045", "do": 0x0000, "di": 0x0003},
+    37: {"model": "I-7051", "di": 0x0111},
+    38: {"model": "I-7051", "di": 0x0007},
+    39: {"model": "I-7051", "di": 0x0280}
 }
 
 # Эффекты: какие биты влияют на какие AI
@@ -41,25 +41,34 @@ do_bit_effects = {
     (31, 1): {"target": (11, 0), "delta": -0.1},  # lift_down
 }
 
-last_update = time.time()
+# Ответы на $xxM — закодированы один раз
+MODEL_CODES = {
+    "I-7017": "7017",
+    "I-7018": "7018",
+    "I-7045": "7045",
+    "I-7051": "7051"
+}
+MODEL_RESPONSE = {
+    addr: f"!{addr:02d}{MODEL_CODES.get(dev['model'], 'XXXX')}\r".encode()
+    for addr, dev in devices.items()
+}
+
+EFFECT_PERIOD_NS = 500_000_000  # шаг эффектов DO, нс
 
 
 def handle_client(ser: serial.Serial):
     print(f"[SIMULATOR] Готов к подключению на {ser.port}", flush=True)
 
-    global last_update
+    # Кадр читаем целиком до \r; время в цикле — одно чтение monotonic_ns за итерацию
+    ser.timeout = 0.05
+    last_update_ns = time.monotonic_ns()
     while True:
         try:
-            buffer = ""
-            start_time = time.time()
-            while time.time() - start_time < 0.5 and ser.in_waiting > 0:
-                char = ser.read(1).decode('ascii', errors='ignore')
-                if char in '\r':
-                    break
-                buffer += char
-            line = buffer.strip()
-
-            if not line:
+            raw = ser.read_until(b'\r', 64)
+            now = time.monotonic_ns()
+            line = raw.decode('ascii', errors='ignore').strip()
+
+            if not line and now - last_update_ns < EFFECT_PERIOD_NS:
                 continue
 
             # print(f"[SIMULATOR] Получено: {repr(line)}", flush=True)
@@ -71,19 +80,12 @@ def handle_client(ser: serial.Serial):
                 except ValueError:
                     continue
 
-                if addr not in devices:
+                response = MODEL_RESPONSE.get(addr)
+                if response is None:
                     print(f"[SIMULATOR] ❌ Устройство #{addr} не найдено", flush=True)
                     continue
 
-                model_code = {
-                    "I-7017": "7017",
-                    "I-7018": "7018",
-                    "I-7045": "7045",
-                    "I-7051": "7051"
-                }.get(devices[addr]["model"], "XXXX")
-
-                response = f"!{line[1:3]}{model_code}\r"
-                ser.write(response.encode())
+                ser.write(response)
                 # print(f"[SIMULATOR] Получено: {repr(line)} Отправлено: {repr(response.strip())}", flush=True)
 
             # === 2. #310001 — запись младшего байта ===
@@ -102,20 +104,21 @@ def handle_client(ser: serial.Serial):
                 if device["model"] != "I-7045":
                     continue
 
-                # Текущее состояние DO (в HEX строке, например "0000")
-                do_current = device["do"]  # строка "HHLL"
-                high_byte = do_current[0:2]  # старший
-                low_byte = do_current[2:4]  # младший
+                # Текущее состояние DO — 16-битное целое, HEX только в ответах
+                try:
+                    value = int(data, 16)
+                except ValueError:
+                    continue
 
                 if cmd == "00":
                     # Запись в младший байт
-                    new_do = high_byte + data.upper()
+                    new_do = (device["do"] & 0xFF00) | value
                     device["do"] = new_do
                     # print(f"[SIMULATOR] DO #{addr} младший байт: {low_byte} → {data.upper()} (now {new_do})",flush=True)
 
                 elif cmd == "0B":
                     # Запись в старший байт
-                    new_do = data.upper() + low_byte
+                    new_do = (device["do"] & 0x00FF) | (value << 8)
                     device["do"] = new_do
                     # print(f"[SIMULATOR] DO #{addr} старший байт: {high_byte} → {data.upper()} (now {new_do})",flush=True)
 
@@ -162,26 +165,22 @@ def handle_client(ser: serial.Serial):
 
                 device = devices[addr]
                 if "di" in device:
-                    response = f">{device['di'].upper()}\r"
+                    response = f">{device['di']:04X}\r"
                     ser.write(response.encode())
                     # if device["model"] == "I-7045":
                     # print(f"[SIMULATOR] Получено: {repr(line)} Отправлено: {repr(response.strip())}", flush=True)
 
             # === 5. Эмуляция реакции на DO (например, давление растёт) ===
-            current_time = time.time()
-            if current_time - last_update >= 0.5:
+            if now - last_update_ns >= EFFECT_PERIOD_NS:
                 for (do_addr, bit), effect in do_bit_effects.items():
-                    do_value_hex = devices[do_addr].get("do", "0000")
-                    do_value = int(do_value_hex, 16)
+                    do_value = devices[do_addr].get("do", 0)
                     if do_value & (1 << bit):
                         target_ai_addr, channel = effect["target"]
                         delta = effect["delta"]
                         current = devices[target_ai_addr]["ai"][channel]
                         new_value = max(0.0, current + delta * 0.5)
                         devices[target_ai_addr]["ai"][channel] = round(new_value, 3)
-                last_update = current_time
-
-            time.sleep(0.01)
+                last_update_ns = now
 
         except Exception as e:
             print(f"[SIMULATOR] ОШИБКА: {e}", flush=True)
@@ -1,8 +1,10 @@
 # simulator.py
+import array
 import serial
 import time
 import json
 import os
+import re
 import threading
 import queue
 
@@ -28,19 +30,19 @@ except FileNotFoundError:
     print("❌ hardware_config.json не найден")
     exit(1)
 
-# Эмуляция устройств
+# Эмуляция устройств (DO/DI — целые 16-битные слова, в HEX только в ответе; AI — плотный массив double)
 devices = {
-    11: {"model": "I-7017", "ai": [2.412, 2.712, 1.247, 0.224, 0.287, 0.246, 0.209, 0.178]},
-    17: {"model": "I-7018", "ai": [20.5, 20.2, 20.4, 18.1, 21.2, 22.0, 22.1, 27.9]},
-    18: {"model": "I-7018", "ai": [19.8, 19.6, 19.8, 20.2, 17.7, 21.8, 19.4, 29.8]},
-    19: {"model": "I-7018", "ai": [20.1, 19.9, 20.1, 20.4, 20.9, 21.6, 21.7, 27.5]},
-    31: {"model": "I-7045", "do": "0000", "di": "0111"},
-    32: {"model": "I-7045", "do": "0000", "di": "000C"},
-    33: {"model": "I-7045", "do": "0000", "di": "0008"},
-    34: {"model": "I-7045", "do": "0000", "di": "0003"},
-    37: {"model": "I-7051", "di": "0111"},
-    38: {"model": "I-7051", "di": "0007"},
-    39: {"model": "I-7051", "di": "0280"}
+    11: {"model": "I-7017", "ai": array.array("d", [2.412, 2.712, 1.247, 0.224, 0.287, 0.246, 0.209, 0.178])},
+    17: {"model": "I-7018", "ai": array.array("d", [20.5, 20.2, 20.4, 18.1, 21.2, 22.0, 22.1, 27.9])},
+    18: {"model": "I-7018", "ai": array.array("d", [19.8, 19.6, 19.8, 20.2, 17.7, 21.8, 19.4, 29.8])},
+    19: {"model": "I-7018", "ai": array.array("d", [20.1, 19.9, 20.1, 20.4, 20.9, 21.6, 21.7, 27.5])},
+    31: {"model": "I-7045", "do": 0x0000, "di": 0x0111},
+    32: {"model": "I-7045", "do": 0x0000, "di": 0x000C},
+    33: {"model": "I-7045", "do": 0x0000, "di": 0x0008},
+    34: {"model": "I-7045", "do": 0x0000, "di": 0x0003},
+    37: {"model": "I-7051", "di": 0x0111},
+    38: {"model": "I-7051", "di": 0x0007},
+    39: {"model": "I-7051", "di": 0x0280}
 }
 
 do_bit_effects = {
@@ -48,7 +50,67 @@ do_bit_effects = {
     (31, 1): {"target": (11, 0), "delta": -0.1},  # lift_down
 }
 
-last_update = time.time()
+# Эффекты, сгруппированные по модулю DO: mod → (маска всех битов, [(bit, (ai_addr, channel), delta), ...])
+effects_by_mod = {}
+for (do_addr, bit), effect in do_bit_effects.items():
+    mask, effects = effects_by_mod.setdefault(do_addr, (0, []))
+    effects.append((bit, effect["target"], effect["delta"]))
+    effects_by_mod[do_addr] = (mask | (1 << bit), effects)
+
+# HEX байта: 16-битное слово = HEX2[старший] + HEX2[младший]
+HEX2 = [f"{i:02X}" for i in range(256)]
+
+
+def hex4(value):
+    """16-битное слово DI/DO в виде 4 HEX-знаков"""
+    return HEX2[(value >> 8) & 0xFF] + HEX2[value & 0xFF]
+
+
+EFFECT_PERIOD = 0.5  # с, шаг применения эффектов DO
+devices_lock = threading.Lock()  # devices: цикл порта и клавиш против потока эффектов
+
+# Клавиши входов пресса: (поле control_inputs, клавиши Пресс-1/2/3, подпись, текст вкл, текст выкл)
+_PRESS_KEYS = (
+    ("start_btn", "123", "Старт", "нажата", "отпущена"),
+    ("stop_btn", "sss", "Стоп", "нажата", "отпущена"),
+    ("pause_btn", "ppp", "Пауза", "нажата", "отпущена"),
+    ("limit_switch", "jkl", "Лимит", "достигнут", "не достигнут"),
+    ("preheat_btn", "tyu", "Прогрев", "нажата", "отпущена"),
+)
+# Общие входы на di_module_2: (клавиша, поле common, подпись, текст вкл, текст выкл)
+_COMMON_KEYS = (
+    ("e", "e_stop", "E-Stop", "активирован", "деактивирован"),
+    ("d", "door_closed", "Дверь", "открыта", "закрыта"),
+    ("c", "press_closed", "Форма", "форма закрыта", "форма открыта"),
+)
+
+
+def _build_keymap():
+    """Клавиша → [(модуль DI, бит, подпись, текст вкл, текст выкл), ...] — один проход по hw_config"""
+    keymap = {}
+    for field, keys, label, on_text, off_text in _PRESS_KEYS:
+        for pid, (key, press) in enumerate(zip(keys, hw_config["presses"]), 1):
+            inp = press.get("control_inputs", {}).get(field)
+            if inp:
+                keymap.setdefault(key, []).append((int(inp["module"]), inp["bit"], f"{label}-{pid}", on_text, off_text))
+    common = hw_config["common"]
+    for key, field, label, on_text, off_text in _COMMON_KEYS:
+        inp = common.get(field)
+        if inp and common.get("di_module_2"):
+            keymap.setdefault(key, []).append((int(common["di_module_2"]), inp["bit"], label, on_text, off_text))
+    return keymap
+
+
+KEYMAP = _build_keymap()
+
+
+def toggle_bit(module, bit, label, on_text, off_text):
+    """Инвертирует бит DI модуля и печатает новое состояние"""
+    with devices_lock:
+        current = devices[module].get("di", 0) ^ (1 << bit)
+        devices[module]["di"] = current
+        devices[module]["_di_reply"] = None
+    print(f"✅ [SIM] {label}: {on_text if current & (1 << bit) else off_text} | DI-{module} = {hex4(current)}")
 
 
 def keyboard_listener():
@@ -69,247 +131,181 @@ def keyboard_listener():
     print("  Q           — Выход")
     print("="*60 + "\n")
 
+    # Поток спит в блокирующем чтении до нажатия клавиши — без опроса по таймеру
+    if os.name == 'nt':  # Windows
+        import msvcrt
+        read_keys = msvcrt.getwch
+    else:  # Unix
+        import sys, atexit, termios, tty
+        fd = sys.stdin.fileno()
+        if os.isatty(fd):
+            # Клавиши без Enter; при выходе вернуть терминал как был
+            atexit.register(termios.tcsetattr, fd, termios.TCSADRAIN, termios.tcgetattr(fd))
+            tty.setcbreak(fd)
+
+        def read_keys():
+            data = os.read(fd, 32)
+            if not data:
+                raise EOFError("stdin закрыт")
+            return data.decode('utf-8', errors='ignore')
+
     while True:
         try:
-            if os.name == 'nt':  # Windows
-                import msvcrt
-                if msvcrt.kbhit():
-                    key = msvcrt.getch().decode('utf-8', errors='ignore').lower()
-                    key_queue.put(key)
-            else:  # Unix
-                import sys, select
-                if select.select([sys.stdin], [], [], 0) == ([sys.stdin], [], []):
-                    key = sys.stdin.read(1).lower()
-                    key_queue.put(key)
+            for key in read_keys():
+                key_queue.put(key.lower())
+        except EOFError:
+            return
         except Exception as e:
             print(f"[KEY] Ошибка ввода: {e}")
-        time.sleep(0.05)
+            time.sleep(0.05)
+
+
+# Ответ на чтение AI: 8 каналов одним готовым шаблоном
+_AI_LINE = (">" + "{:+07.3f}" * 8 + "\r").format
+
+# Неизменные ответы — закодированы один раз
+_MODEL_CODES = {
+    "I-7017": "7017",
+    "I-7018": "7018",
+    "I-7045": "7045",
+    "I-7051": "7051"
+}
+_MODEL_REPLY = {
+    addr: f"!{addr:02d}{_MODEL_CODES.get(dev['model'], 'XXXX')}\r".encode()
+    for addr, dev in devices.items()
+}
+_OK = b">\r"
+
+
+def handle_model(write, line, addr, device):
+    """$01M — модель"""
+    if line[3] != ord("M"):
+        return
+    write(_MODEL_REPLY[addr])
+
+
+def handle_write_do(write, line, addr, device):
+    """#310001 — запись DO"""
+    if device["model"] != "I-7045":
+        return
+    cmd = line[3:5]
+    try:
+        data = int(line[5:7], 16)
+    except ValueError:
+        return
+    if cmd == b"00":
+        new_do = (device["do"] & 0xFF00) | data
+    elif cmd == b"0B":
+        new_do = (device["do"] & 0x00FF) | (data << 8)
+    else:
+        return
+    device["do"] = new_do
+    device['di'] = new_do
+    device["_di_reply"] = None
+    write(_OK)
+
+
+def handle_read(write, line, addr, device):
+    """#31 — чтение DO/AI"""
+    if device["model"] == "I-7045":
+        write(b">\r\r")
+    elif device["model"] in ("I-7017", "I-7018"):
+        # Готовый ответ храним до изменения значений (сброс — в тике эффектов)
+        reply = device.get("_ai_reply")
+        if reply is None:
+            reply = device["_ai_reply"] = _AI_LINE(*device["ai"]).encode('ascii')
+        write(reply)
+
+
+def handle_read_di(write, line, addr, device):
+    """@31 — чтение DI"""
+    if "di" in device:
+        # Готовый ответ храним до изменения DI (сброс — при записи DO и по клавишам)
+        reply = device.get("_di_reply")
+        if reply is None:
+            reply = device["_di_reply"] = (">" + hex4(device['di']) + "\r").encode()
+        write(reply)
+
+
+# Префикс команды DCON: тип (#, $, @) и два десятичных знака адреса
+CMD_RE = re.compile(rb"([#$@])(\d\d)")
+
+# (первый байт, длина) → обработчик; длина None — любая, если точного совпадения нет
+HANDLERS = {
+    (ord('$'), 4): handle_model,
+    (ord('#'), 7): handle_write_do,
+    (ord('#'), None): handle_read,
+    (ord('@'), 3): handle_read_di,
+}
+
+
+def effects_tick():
+    """Поток эффектов DO: раз в EFFECT_PERIOD меняет AI по включённым битам DO"""
+    next_tick = time.monotonic() + EFFECT_PERIOD
+    while True:
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+        next_tick += EFFECT_PERIOD
+        with devices_lock:
+            for do_addr, (mask, effects) in effects_by_mod.items():
+                do_value = devices[do_addr].get("do", 0)
+                if not do_value & mask:
+                    continue  # Ни один бит с эффектом не включён
+                for bit, (target_ai_addr, channel), delta in effects:
+                    if do_value & (1 << bit):
+                        target = devices[target_ai_addr]
+                        ai = target["ai"]
+                        ai[channel] = max(0.0, ai[channel] + delta * EFFECT_PERIOD)
+                        target["_ai_reply"] = None
+
+
+def _fd_writer(ser):
+    """Запись ответов прямо в дескриптор порта, минуя обёртки pyserial (не Windows)"""
+    fd = ser.fileno()
+
+    def write(data):
+        try:
+            n = os.write(fd, data)
+        except BlockingIOError:
+            n = 0
+        if n < len(data):
+            ser.write(data[n:])  # Остаток — штатной записью pyserial, она дождётся буфера
+    return write
 
 
 def handle_client(ser: serial.Serial):
     print(f"[SIMULATOR] Готов к подключению на {ser.port}", flush=True)
 
-    global last_update
+    # Кадр DCON читаем целиком до \r. Блокирующее чтение и задаёт темп цикла;
+    # таймаут короткий, чтобы клавиши не ждали
+    ser.timeout = 0.05
+    write = _fd_writer(ser) if os.name != 'nt' else ser.write
+    out = bytearray()  # Ответы копятся, пока во входном буфере есть следующие команды
     while True:
         try:
-            buffer = ""
-            start_time = time.time()
-            while time.time() - start_time < 0.5 and ser.in_waiting > 0:
-                char = ser.read(1).decode('ascii', errors='ignore')
-                if char in '\r':
-                    break
-                buffer += char
-            line = buffer.strip()
-
-            if not line:
-                continue
-
-            # === 1. $01M — модель ===
-            if len(line) == 4 and line.startswith("$") and line[3] == "M":
-                try:
-                    addr = int(line[1:3])
-                except ValueError:
-                    continue
-                if addr not in devices:
-                    continue
-                model_code = {
-                    "I-7017": "7017",
-                    "I-7018": "7018",
-                    "I-7045": "7045",
-                    "I-7051": "7051"
-                }.get(devices[addr]["model"], "XXXX")
-                response = f"!{line[1:3]}{model_code}\r"
-                ser.write(response.encode())
-
-            # === 2. #310001 — запись DO ===
-            elif line.startswith("#") and len(line) == 7:
-                try:
-                    addr = int(line[1:3])
-                    cmd = line[3:5]
-                    data = line[5:7]
-                except:
-                    continue
-                if addr not in devices or devices[addr]["model"] != "I-7045":
-                    continue
-                do_current = devices[addr]["do"]
-                high_byte = do_current[0:2]
-                low_byte = do_current[2:4]
-                if cmd == "00":
-                    new_do = high_byte + data.upper()
-                    devices[addr]["do"] = new_do
-                elif cmd == "0B":
-                    new_do = data.upper() + low_byte
-                    devices[addr]["do"] = new_do
-                else:
-                    continue
-                devices[addr]['di'] = new_do
-                ser.write(b">\r")
-
-            # === 3. #31 — чтение DO/AI ===
-            elif line.startswith("#") and len(line) != 7:
-                try:
-                    addr = int(line[1:3])
-                except ValueError:
-                    continue
-                if addr not in devices:
-                    continue
-                device = devices[addr]
-                response = ""
-                if device["model"] == "I-7045":
-                    response = f">\r"
-                elif device["model"] in ("I-7017", "I-7018"):
-                    response = ">" + "".join(f"{val:+07.3f}" for val in device["ai"])
-                if response:
-                    ser.write((response + "\r").encode())
-
-            # === 4. @31 — чтение DI ===
-            elif line.startswith("@") and len(line) == 3:
-                try:
-                    addr = int(line[1:3])
-                except ValueError:
-                    continue
-                if addr not in devices:
-                    continue
-                device = devices[addr]
-                if "di" in device:
-                    response = f">{device['di'].upper()}\r"
-                    ser.write(response.encode())
-
-            # === 5. Эффекты от DO ===
-            current_time = time.time()
-            if current_time - last_update >= 0.5:
-                for (do_addr, bit), effect in do_bit_effects.items():
-                    do_value_hex = devices[do_addr].get("do", "0000")
-                    do_value = int(do_value_hex, 16)
-                    if do_value & (1 << bit):
-                        target_ai_addr, channel = effect["target"]
-                        delta = effect["delta"]
-                        current = devices[target_ai_addr]["ai"][channel]
-                        new_value = max(0.0, current + delta * 0.5)
-                        devices[target_ai_addr]["ai"][channel] = round(new_value, 3)
-                last_update = current_time
-
-            # === 6. Обработка клавиш ===
+            # Команду разбираем прямо в bytes, без decode
+            line = ser.read_until(b'\r', 64).strip()
+
+            # === 1-4. Команда DCON: адрес разбираем один раз, ветку выбираем по таблице ===
+            m = CMD_RE.match(line)
+            if m:
+                addr = int(m.group(2))
+                device = devices.get(addr)
+                if device is not None:
+                    handler = HANDLERS.get((line[0], len(line))) or HANDLERS.get((line[0], None))
+                    if handler is not None:
+                        with devices_lock:
+                            handler(out.extend, line, addr, device)
+            if out and not ser.in_waiting:
+                write(bytes(out))
+                out.clear()
+
+            # === 5. Обработка клавиш (эффекты DO — в потоке effects_tick) ===
             try:
                 key = key_queue.get_nowait()
                 if key == 'q':
                     print("[SIM] Завершение по запросу...")
                     break
 
-                elif key in '123':
-                    press_id = int(key)
-                    module = int(hw_config["presses"][press_id-1]["control_inputs"]["start_btn"]["module"])
-                    bit = hw_config["presses"][press_id-1]["control_inputs"]["start_btn"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    print(f"✅ [SIM] Старт-{press_id}: {'нажата' if current & (1<<bit) else 'отпущена'} | DI-{module} = {current:04X}")
-
-                elif key == 's':
-                    for pid in [1,2,3]:
-                        module = int(hw_config["presses"][pid-1]["control_inputs"]["stop_btn"]["module"])
-                        bit = hw_config["presses"][pid-1]["control_inputs"]["stop_btn"]["bit"]
-                        current = int(devices[module].get("di", "0000"), 16)
-                        current ^= (1 << bit)
-                        devices[module]["di"] = f"{current:04X}"
-                        print(f"✅ [SIM] Стоп-{pid}: {'нажата' if current & (1<<bit) else 'отпущена'}")
-
-                elif key == 'p':
-                    for pid in [1,2,3]:
-                        module = int(hw_config["presses"][pid-1]["control_inputs"]["pause_btn"]["module"])
-                        bit = hw_config["presses"][pid-1]["control_inputs"]["pause_btn"]["bit"]
-                        current = int(devices[module].get("di", "0000"), 16)
-                        current ^= (1 << bit)
-                        devices[module]["di"] = f"{current:04X}"
-                        print(f"✅ [SIM] Пауза-{pid}: {'нажата' if current & (1<<bit) else 'отпущена'}")
-
-                elif key == 'e':
-                    module = int(hw_config["common"]["di_module_2"])
-                    bit = hw_config["common"]["e_stop"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "активирован" if current & (1<<bit) else "деактивирован"
-                    print(f"✅ [SIM] E-Stop: {status} | DI-{module} = {current:04X}")
-
-                elif key == 'd':
-                    module = int(hw_config["common"]["di_module_2"])
-                    bit = hw_config["common"]["door_closed"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "открыта" if current & (1<<bit) else "закрыта"
-                    print(f"✅ [SIM] Дверь: {status} | DI-{module} = {current:04X}")
-
-                elif key == 'c':
-                    module = int(hw_config["common"]["di_module_2"])
-                    bit = hw_config["common"]["press_closed"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "форма закрыта" if current & (1<<bit) else "форма открыта"
-                    print(f"✅ [SIM] Форма: {status} | DI-{module} = {current:04X}")
-
-                elif key == 'j':
-                    press_id = 1
-                    module = int(hw_config["presses"][press_id - 1]["control_inputs"]["limit_switch"]["module"])
-                    bit = hw_config["presses"][press_id - 1]["control_inputs"]["limit_switch"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "достигнут" if current & (1 << bit) else "не достигнут"
-                    print(f"✅ [SIM] Лимит-{press_id}: {status} | DI-{module} = {current:04X}")
-
-                elif key == 'k':
-                    press_id = 2
-                    module = int(hw_config["presses"][press_id - 1]["control_inputs"]["limit_switch"]["module"])
-                    bit = hw_config["presses"][press_id - 1]["control_inputs"]["limit_switch"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "достигнут" if current & (1 << bit) else "не достигнут"
-                    print(f"✅ [SIM] Лимит-{press_id}: {status} | DI-{module} = {current:04X}")
-
-                elif key == 'l':
-                    press_id = 3
-                    module = int(hw_config["presses"][press_id - 1]["control_inputs"]["limit_switch"]["module"])
-                    bit = hw_config["presses"][press_id - 1]["control_inputs"]["limit_switch"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "достигнут" if current & (1 << bit) else "не достигнут"
-                    print(f"✅ [SIM] Лимит-{press_id}: {status} | DI-{module} = {current:04X}")
-
-                elif key == 't':
-                    press_id = 1
-                    module = int(hw_config["presses"][press_id - 1]["control_inputs"]["preheat_btn"]["module"])
-                    bit = hw_config["presses"][press_id - 1]["control_inputs"]["preheat_btn"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "нажата" if current & (1 << bit) else "отпущена"
-                    print(f"✅ [SIM] Прогрев-{press_id}: {status} | DI-{module} = {current:04X}")
-
-                elif key == 'y':
-                    press_id = 2
-                    module = int(hw_config["presses"][press_id - 1]["control_inputs"]["preheat_btn"]["module"])
-                    bit = hw_config["presses"][press_id - 1]["control_inputs"]["preheat_btn"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "нажата" if current & (1 << bit) else "отпущена"
-                    print(f"✅ [SIM] Прогрев-{press_id}: {status} | DI-{module} = {current:04X}")
-
-                elif key == 'u':
-                    press_id = 3
-                    module = int(hw_config["presses"][press_id - 1]["control_inputs"]["preheat_btn"]["module"])
-                    bit = hw_config["presses"][press_id - 1]["control_inputs"]["preheat_btn"]["bit"]
-                    current = int(devices[module].get("di", "0000"), 16)
-                    current ^= (1 << bit)
-                    devices[module]["di"] = f"{current:04X}"
-                    status = "нажата" if current & (1 << bit) else "отпущена"
-                    print(f"✅ [SIM] Прогрев-{press_id}: {status} | DI-{module} = {current:04X}")
-
                 elif key == '?':
                     print("\n" + "="*50)
                     print("       📋 СПРАВКА ПО УПРАВЛЕНИЮ")
@@ -325,11 +321,13 @@ def handle_client(ser: serial.Serial):
                     print("  Q     — Выход")
                     print("="*50 + "\n")
 
+                else:
+                    for module, bit, label, on_text, off_text in KEYMAP.get(key, ()):
+                        toggle_bit(module, bit, label, on_text, off_text)
+
             except queue.Empty:
                 pass
 
-            time.sleep(0.01)
-
         except Exception as e:
             print(f"[SIMULATOR] ОШИБКА: {e}", flush=True)
             break
@@ -344,6 +342,10 @@ def start_simulator():
         kb_thread = threading.Thread(target=keyboard_listener, daemon=True)
         kb_thread.start()
 
+        # Эффекты DO тикают по своему таймеру, независимо от потока команд
+        fx_thread = threading.Thread(target=effects_tick, daemon=True)
+        fx_thread.start()
+
         print(f"[SIMULATOR] Запущен на {ser.port}")
         handle_client(ser)
     except Exception as e:
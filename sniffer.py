@@ -1,8 +1,6 @@
 # sniffer.py
 # Перехватывает и анализирует данные, идущие на графический компьютер
 import serial
-import time
-import binascii
 from datetime import datetime
 
 # Настройки — попробуй разные, если не видишь данных
@@ -11,7 +9,10 @@ BAUDRATE = 1200  # Попробуй: 9600, 19200, 38400, 115200
 BYTESIZE = 8
 PARITY = 'N'
 STOPBITS = 1
-TIMEOUT = 2
+TIMEOUT = 0.5  # Ожидание первого байта пачки
+
+# Печатные ASCII-символы как есть, остальные байты — точкой
+ASCII_TABLE = bytes(b if 32 <= b < 127 else ord('.') for b in range(256))
 
 
 def sniff():
@@ -28,25 +29,24 @@ def sniff():
         print("-" * 60)
 
         while True:
-            if ser.in_waiting > 0:
-                # Читаем всё, что есть
-                raw_data = ser.read(ser.in_waiting)
+            # Блокируемся до первого байта, затем одним чтением забираем остаток пачки
+            first = ser.read(1)
+            if first:
+                raw_data = first + ser.read(ser.in_waiting)
                 timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
 
                 # Выводим в разных форматах
                 print(f"[{timestamp}] Длина: {len(raw_data)} байт")
 
                 # HEX
-                hex_data = binascii.hexlify(raw_data).decode().upper()
+                hex_data = raw_data.hex().upper()
                 print(f"  HEX:  {hex_data}")
 
                 # ASCII (если текст)
-                ascii_data = ''.join([chr(b) if 32 <= b < 127 else '.' for b in raw_data])
+                ascii_data = raw_data.translate(ASCII_TABLE).decode('ascii')
                 print(f"  ASCII: {ascii_data}")
 
                 print("-" * 60)
-            else:
-                time.sleep(0.1)
 
     except serial.SerialException as e:
         print(f"[SNIFFER] Ошибка порта: {e}")
@@ -20,19 +20,9 @@ def send_command(ser: serial.Serial, cmd: str) -> str:
     print(f"Отправляю: {cmd!r}")
     ser.write((cmd + "\r").encode('utf-8'))
 
-    # Буфер для ответа
-    buffer = b''
-    start_time = time.time()
-
-    while (time.time() - start_time) < TIMEOUT:
-        if ser.in_waiting > 0:
-            byte = ser.read(1)
-            buffer += byte
-            if byte == b'\r' or len(buffer) > 100:
-                break
-        else:
-            time.sleep(0.01)
-    else:
+    # Ответ целиком до \r (или 100 байт); ожидание ограничено таймаутом порта
+    buffer = ser.read_until(b'\r', 100)
+    if not buffer.endswith(b'\r') and len(buffer) < 100:
         print("❌ Таймаут при ожидании ответа")
         return None
 
@@ -46,7 +36,7 @@ def main():
         ser = serial.Serial(
             port=PORT,
             baudrate=BAUDRATE,
-            timeout=0,  # Ручное управление
+            timeout=TIMEOUT,  # Ожидание ответа в read_until
             bytesize=8,
             stopbits=1,
             parity='N'